@@ -1,6 +1,7 @@
 import os
 
 from .client import Client
+from .async_client import AsyncClient
 from .errors import BadRequest, AuthenticationFailed
 
 __version__ = '2.0.2'
@@ -0,0 +1,96 @@
+from multiprocessing.pool import ThreadPool
+
+from .client import DEFAULT_POOL_MAXSIZE
+
+
+class AsyncClient(object):
+    """Non-blocking counterpart of :class:`orchard.client.Client`.
+
+    Every call returns an ``AsyncResult`` straight away; the request runs on a
+    shared pool of worker threads over the wrapped client's pooled session.
+    ``result.get()`` returns the value or raises the same
+    :class:`orchard.errors.HTTPError` the blocking client would have.
+
+        >>> api = AsyncClient(orchard.with_token(token))
+        >>> pending = [api.hosts.create({"name": n}) for n in names]
+        >>> hosts = [p.get() for p in pending]
+    """
+
+    def __init__(self, client, workers=DEFAULT_POOL_MAXSIZE):
+        self.client = client
+        self.pool = ThreadPool(workers)
+
+    @property
+    def hosts(self):
+        return AsyncCollection(self, self.client.hosts)
+
+    def customer_data(self):
+        return self.submit(self.client.customer_data)
+
+    def request(self, *args, **kwargs):
+        return self.submit(self.client.request, *args, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        return self.pool.apply_async(fn, args, kwargs)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.client.close()
+
+
+class AsyncCollection(object):
+    def __init__(self, async_client, collection):
+        self.async_client = async_client
+        self.collection = collection
+
+    def fetch(self):
+        return self._submit(self._fetch)
+
+    def get(self, key):
+        return self._submit(lambda: self._wrap(self.collection.get(key)))
+
+    def create(self, attrs=None):
+        return self._submit(lambda: self._wrap(self.collection.create(attrs)))
+
+    def delete(self, model):
+        if isinstance(model, AsyncModel):
+            model = model.model
+        return self._submit(self.collection.delete, model)
+
+    def _fetch(self):
+        self.collection.fetch()
+        return map(self._wrap, self.collection.models)
+
+    def _wrap(self, model):
+        return AsyncModel(self.async_client, model)
+
+    def _submit(self, fn, *args, **kwargs):
+        return self.async_client.submit(fn, *args, **kwargs)
+
+
+class AsyncModel(object):
+    """Wraps a model so that its API calls return ``AsyncResult`` objects.
+    Attributes and local-only methods such as ``Host.docker()`` are passed
+    through unchanged."""
+
+    def __init__(self, async_client, model):
+        self.async_client = async_client
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __eq__(self, other):
+        if isinstance(other, AsyncModel):
+            other = other.model
+        return self.model == other
+
+    def __repr__(self):
+        return repr(self.model)
+
+    def update(self, attrs):
+        return self.async_client.submit(self.model.update, attrs)
+
+    def delete(self):
+        return self.async_client.submit(self.model.delete)
@@ -0,0 +1,238 @@
+import errno
+import logging
+import os
+import select
+import socket
+import ssl
+import threading
+from multiprocessing.pool import ThreadPool
+
+from .client import DEFAULT_POOL_MAXSIZE
+from .packages.docker.utils import streams
+
+log = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+
+class StreamWatcher(object):
+    """Reads any number of daemon streams from a single thread.
+
+    Each watched socket is polled for input and whatever arrives is passed to
+    its decoder's ``feed()``; ``on_close`` is called with ``None`` at the end
+    of the stream, or with the exception that ended it.
+    """
+
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._poller = select.poll()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._poller.register(self._wakeup_r, select.POLLIN)
+
+        thread = threading.Thread(target=self._run, name='orchard-streams')
+        thread.daemon = True
+        thread.start()
+
+    def watch(self, sock, decoder, on_close=None, buffered=b''):
+        sock.setblocking(0)
+        handle = StreamHandle(self, sock, decoder, on_close)
+
+        if buffered:
+            decoder.feed(buffered)
+
+        with self._lock:
+            self._streams[sock.fileno()] = handle
+            self._poller.register(sock.fileno(), select.POLLIN)
+        self._wakeup()
+
+        # The whole of a short chunked response may have come in with the
+        # headers.
+        if getattr(decoder, 'done', False):
+            handle._finish(None)
+
+        return handle
+
+    def unwatch(self, handle):
+        with self._lock:
+            if self._streams.pop(handle.fileno, None) is None:
+                return False
+            self._poller.unregister(handle.fileno)
+        self._wakeup()
+        return True
+
+    def _wakeup(self):
+        os.write(self._wakeup_w, b'x')
+
+    def _run(self):
+        while True:
+            try:
+                events = self._poller.poll()
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            for fd, _ in events:
+                if fd == self._wakeup_r:
+                    os.read(self._wakeup_r, 4096)
+                    continue
+
+                with self._lock:
+                    handle = self._streams.get(fd)
+                if handle is not None:
+                    self._read(handle)
+
+    def _read(self, handle):
+        try:
+            while True:
+                try:
+                    data = handle.sock.recv(READ_SIZE)
+                except ssl.SSLError as e:
+                    if e.args[0] == ssl.SSL_ERROR_WANT_READ:
+                        return
+                    raise
+                except socket.error as e:
+                    if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        return
+                    raise
+
+                if not data:
+                    handle._finish(None)
+                    return
+
+                handle.decoder.feed(data)
+
+                # A chunked response can end before the connection does.
+                if getattr(handle.decoder, 'done', False):
+                    handle._finish(None)
+                    return
+        except Exception as e:
+            log.exception('Error reading stream')
+            handle._finish(e)
+
+
+class StreamHandle(object):
+    def __init__(self, watcher, sock, decoder, on_close):
+        self.watcher = watcher
+        self.sock = sock
+        self.fileno = sock.fileno()
+        self.decoder = decoder
+        self.on_close = on_close
+
+    def close(self):
+        self._finish(None)
+
+    def _finish(self, error):
+        if not self.watcher.unwatch(self):
+            return
+        self.sock.close()
+        if self.on_close is not None:
+            self.on_close(error)
+
+
+_default_watcher = None
+_default_watcher_lock = threading.Lock()
+
+
+def default_watcher():
+    global _default_watcher
+    with _default_watcher_lock:
+        if _default_watcher is None:
+            _default_watcher = StreamWatcher()
+        return _default_watcher
+
+
+class AsyncDockerClient(object):
+    """Non-blocking counterpart of :class:`orchard.docker_client.DockerClient`.
+
+    Request/response calls such as ``containers()``, ``inspect_container()``,
+    ``create_container()``, ``start()``, ``stop()`` and ``wait()`` run on a
+    pool of worker threads and return an ``AsyncResult`` straight away.
+
+    Streaming calls take a callback instead. ``attach()`` and ``logs()`` call
+    ``callback(stream_id, data)``; ``events()``, ``pull()`` and ``push()``
+    call ``callback(message)`` with each decoded JSON message. They return an
+    ``AsyncResult`` for a :class:`StreamHandle`, and every open stream is read
+    by one shared :class:`StreamWatcher` thread rather than a thread each.
+    """
+
+    def __init__(self, client, workers=DEFAULT_POOL_MAXSIZE, watcher=None):
+        self.client = client
+        self.pool = ThreadPool(workers)
+        self.watcher = watcher or default_watcher()
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            return self.submit(method, *args, **kwargs)
+        return call
+
+    def submit(self, fn, *args, **kwargs):
+        return self.pool.apply_async(fn, args, kwargs)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.client.close()
+
+    def attach(self, container, callback=None, stdout=True, stderr=True,
+               logs=False, on_close=None):
+        if callback is None:
+            return self.submit(self.client.attach, container, stdout=stdout,
+                               stderr=stderr, logs=logs)
+
+        if self.client._is_multiplexed():
+            decoder = streams.FrameDecoder(callback)
+        else:
+            decoder = streams.RawDecoder(callback)
+
+        return self._watch(
+            lambda: self.client._attach_request(container, stdout, stderr,
+                                                stream=True, logs=logs),
+            decoder, on_close
+        )
+
+    def logs(self, container, callback=None, stdout=True, stderr=True,
+             on_close=None):
+        return self.attach(container, callback, stdout=stdout, stderr=stderr,
+                           logs=True, on_close=on_close)
+
+    def events(self, callback, on_close=None):
+        return self._watch(self.client._events_request,
+                           streams.chunked_json_decoder(callback), on_close)
+
+    def pull(self, repository, callback=None, tag=None, on_close=None):
+        if callback is None:
+            return self.submit(self.client.pull, repository, tag=tag)
+
+        return self._watch(
+            lambda: self.client._pull_request(repository, tag, stream=True),
+            streams.chunked_json_decoder(callback), on_close
+        )
+
+    def push(self, repository, callback=None, on_close=None):
+        if callback is None:
+            return self.submit(self.client.push, repository)
+
+        return self._watch(
+            lambda: self.client._push_request(repository, stream=True),
+            streams.chunked_json_decoder(callback), on_close
+        )
+
+    def _watch(self, open_response, decoder, on_close):
+        def open_stream():
+            response = open_response()
+            sock, buffered = self.client._stream_result_socket_buffered(
+                response)
+
+            def closed(error):
+                self.client._release_stream(response)
+                if on_close is not None:
+                    on_close(error)
+            return self.watcher.watch(sock, decoder, closed, buffered)
+
+        return self.submit(open_stream)
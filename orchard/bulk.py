@@ -0,0 +1,55 @@
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from .results import Result
+
+# The same as DockerClient's connection pool size, so every worker gets a
+# pooled connection.
+DEFAULT_CONCURRENCY = 10
+
+ContainerResult = Result
+
+
+def run_many(fn, containers, concurrency=DEFAULT_CONCURRENCY,
+             stop_on_error=False):
+    """Calls ``fn`` with each container ID, at most ``concurrency`` at a
+    time, and returns a dict mapping container IDs to
+    :class:`ContainerResult`.
+
+    If ``stop_on_error`` is true, no new calls are started once one has
+    failed; calls already under way finish, and the containers that were
+    never tried are left out of the result.
+    """
+    ids = []
+    for container in containers:
+        if isinstance(container, dict):
+            container = container.get('Id')
+        ids.append(container)
+    if not ids:
+        return {}
+
+    failed = threading.Event()
+
+    def call(container):
+        if failed.is_set():
+            return None
+        started = time.time()
+        try:
+            return ContainerResult(container, result=fn(container),
+                                   started=started, finished=time.time())
+        except Exception as e:
+            if stop_on_error:
+                failed.set()
+            return ContainerResult(container, error=e, started=started,
+                                   finished=time.time())
+
+    pool = ThreadPool(max(1, min(concurrency, len(ids))))
+    try:
+        results = pool.map(call, ids, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    return dict((result.container, result)
+                for result in results if result is not None)
@@ -1,5 +1,6 @@
 import logging
 import requests
+import requests.adapters
 import orchard
 import urlparse
 
@@ -9,12 +10,48 @@ from .utils import request_to_curl_command
 
 log = logging.getLogger(__name__)
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
 class Client(object):
-    def __init__(self, base_url):
+    """An Orchard API client.
+
+    Each client owns a single long-lived session, so connections (and their
+    TLS state) are reused between calls. ``pool_connections`` is the number
+    of hosts to keep pools for, ``pool_maxsize`` the number of connections
+    kept per host, and ``pool_block`` makes callers wait for a free
+    connection instead of opening extra ones once a host's pool is full. Pass
+    ``keep_alive=False`` to close every connection after its response.
+
+    The session is safe to share between threads.
+    """
+
+    def __init__(self, base_url, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False,
+                 keep_alive=True):
         if base_url.endswith("/"):
             base_url = base_url[:-1]
 
         self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.session = self._build_session(pool_connections, pool_maxsize,
+                                           pool_block)
+
+    def _build_session(self, pool_connections, pool_maxsize, pool_block):
+        session = requests.sessions.Session()
+
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, requests.adapters.HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            ))
+
+        return session
+
+    def close(self):
+        self.session.close()
 
     @property
     def hosts(self):
@@ -33,12 +70,15 @@ class Client(object):
             headers["Authorization"] = "Token %s" % self.token
             headers["User-Agent"] = "python-orchard/%s" % orchard.__version__
 
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+
         req = requests.Request(method, url, headers=headers, **kwargs).prepare()
 
         if not quiet:
             log.debug(request_to_curl_command(req))
 
-        res = requests.sessions.Session().send(req)
+        res = self.session.send(req)
 
         if not quiet:
             log.debug('%s %s' % (res.status_code, res.text))
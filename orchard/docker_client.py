@@ -1,8 +1,221 @@
+from . import bulk, group, template, wait
 from .packages import docker
+from .packages.docker.unixconn import unixconn
 import os.path
+import socket
+import threading
+import time
+
+import requests.adapters
+
+try:
+    from requests.packages.urllib3 import connectionpool, poolmanager
+    from requests.packages.urllib3.connection import VerifiedHTTPSConnection
+except ImportError:
+    from urllib3 import connectionpool, poolmanager
+    from urllib3.connection import VerifiedHTTPSConnection
+
+DEFAULT_IDLE_TIMEOUT = 60
+DEFAULT_KEEPALIVE = 30
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class KeepAliveHTTPSConnection(VerifiedHTTPSConnection):
+    keepalive = None
+
+    def connect(self):
+        VerifiedHTTPSConnection.connect(self)
+
+        if self.keepalive:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # Linux only; elsewhere the system defaults apply.
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE,
+                                     self.keepalive)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL,
+                                     self.keepalive)
+
+
+class KeepAliveHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = KeepAliveHTTPSConnection
+
+    def __init__(self, *args, **kwargs):
+        self.idle_timeout = kwargs.pop('idle_timeout', None)
+        self.keepalive = kwargs.pop('keepalive', None)
+        connectionpool.HTTPSConnectionPool.__init__(self, *args, **kwargs)
+
+    def _new_conn(self):
+        conn = connectionpool.HTTPSConnectionPool._new_conn(self)
+        conn.keepalive = self.keepalive
+        return conn
+
+    def _get_conn(self, timeout=None):
+        conn = connectionpool.HTTPSConnectionPool._get_conn(self, timeout)
+
+        # The other end may have dropped a connection that sat idle too long,
+        # so reconnect rather than find out halfway through a request.
+        last_used = getattr(conn, 'last_used', None)
+        if (self.idle_timeout and last_used and
+                time.time() - last_used > self.idle_timeout):
+            conn.close()
+
+        return conn
+
+    def _put_conn(self, conn):
+        if conn:
+            conn.last_used = time.time()
+        connectionpool.HTTPSConnectionPool._put_conn(self, conn)
+
+
+class KeepAlivePoolManager(poolmanager.PoolManager):
+    def _new_pool(self, scheme, host, port):
+        if scheme != 'https':
+            return poolmanager.PoolManager._new_pool(self, scheme, host, port)
+        return KeepAliveHTTPSConnectionPool(host, port,
+                                            **self.connection_pool_kw)
+
+
+class HostAdapter(unixconn.ChunkedUploadAdapter):
+    """HTTPS adapter for Orchard hosts. Pooled connections idle for more than
+    ``idle_timeout`` seconds are re-established before use, and TCP
+    keep-alive probes are sent every ``keepalive`` seconds."""
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 keepalive=DEFAULT_KEEPALIVE,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False):
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        super(HostAdapter, self).__init__(pool_maxsize=pool_maxsize,
+                                          pool_block=pool_block)
+
+    def init_poolmanager(self, connections, maxsize,
+                         block=requests.adapters.DEFAULT_POOLBLOCK):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        self.poolmanager = KeepAlivePoolManager(
+            num_pools=connections, maxsize=maxsize, block=block,
+            idle_timeout=self.idle_timeout, keepalive=self.keepalive,
+        )
+
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+def shared_adapter(base_url, verify, cert, **kwargs):
+    """Returns the process-wide HostAdapter for a host, set of credentials
+    and adapter settings (the keyword arguments to HostAdapter), so every
+    DockerClient for that host shares one pool of already-established TLS
+    connections."""
+    key = (base_url, verify, cert, tuple(sorted(kwargs.items())))
+    with _adapters_lock:
+        adapter = _adapters.get(key)
+        if adapter is None:
+            adapter = _adapters[key] = HostAdapter(**kwargs)
+        return adapter
+
 
 class DockerClient(docker.Client):
+    """A docker.Client for an Orchard host. Takes the same arguments, plus
+    these keyword-only ones:
+
+    - ``idle_timeout`` and ``keepalive``: see :class:`HostAdapter`.
+    - ``image_cache``: an optional :class:`orchard.image_cache.ImageCache`.
+    """
+
     def __init__(self, base_url, verify, cert, *args, **kwargs):
+        idle_timeout = kwargs.pop('idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        keepalive = kwargs.pop('keepalive', DEFAULT_KEEPALIVE)
+        self.image_cache = kwargs.pop('image_cache', None)
         super(DockerClient, self).__init__(base_url, *args, **kwargs)
         self.verify = verify
         self.cert = cert
+
+        self._shared_adapter = None
+        if base_url.startswith('https://'):
+            self._shared_adapter = shared_adapter(
+                base_url, verify, cert,
+                idle_timeout=idle_timeout, keepalive=keepalive,
+                pool_maxsize=self._pool_maxsize, pool_block=self._pool_block,
+            )
+            self.mount('https://', self._shared_adapter)
+
+    def close(self):
+        # The HTTPS adapter is shared with other clients for this host, so
+        # leave it mounted with its connections open. The rest rebuild their
+        # pools on demand, so the client stays usable, as a Session does.
+        for adapter in self.adapters.values():
+            if adapter is not self._shared_adapter:
+                adapter.close()
+
+    def inspect_image(self, image_id):
+        fetch = super(DockerClient, self).inspect_image
+        if self.image_cache is None:
+            return fetch(image_id)
+        return self.image_cache.inspect_image(self.base_url, image_id, fetch)
+
+    def history(self, image):
+        fetch = super(DockerClient, self).history
+        if self.image_cache is None:
+            return fetch(image)
+        return self.image_cache.history(
+            self.base_url, image, fetch,
+            super(DockerClient, self).inspect_image)
+
+    def inspect_many(self, containers, concurrency=bulk.DEFAULT_CONCURRENCY,
+                     stop_on_error=False):
+        """Inspects many containers at once. Like the other ``*_many``
+        methods, returns a dict mapping container IDs to
+        :class:`orchard.bulk.ContainerResult`; see
+        :func:`orchard.bulk.run_many`."""
+        return bulk.run_many(self.inspect_container, containers,
+                             concurrency, stop_on_error)
+
+    def start_many(self, containers, concurrency=bulk.DEFAULT_CONCURRENCY,
+                   stop_on_error=False, **kwargs):
+        return bulk.run_many(lambda container: self.start(container, **kwargs),
+                             containers, concurrency, stop_on_error)
+
+    def stop_many(self, containers, timeout=10,
+                  concurrency=bulk.DEFAULT_CONCURRENCY, stop_on_error=False):
+        return bulk.run_many(lambda container: self.stop(container, timeout),
+                             containers, concurrency, stop_on_error)
+
+    def restart_many(self, containers, timeout=10,
+                     concurrency=bulk.DEFAULT_CONCURRENCY,
+                     stop_on_error=False):
+        return bulk.run_many(
+            lambda container: self.restart(container, timeout),
+            containers, concurrency, stop_on_error)
+
+    def kill_many(self, containers, signal=None,
+                  concurrency=bulk.DEFAULT_CONCURRENCY, stop_on_error=False):
+        return bulk.run_many(lambda container: self.kill(container, signal),
+                             containers, concurrency, stop_on_error)
+
+    def remove_many(self, containers, v=False, link=False,
+                    concurrency=bulk.DEFAULT_CONCURRENCY, stop_on_error=False):
+        return bulk.run_many(
+            lambda container: self.remove_container(container, v, link),
+            containers, concurrency, stop_on_error)
+
+    def wait_any(self, containers, timeout=None):
+        """Waits for the first of several containers to exit; see
+        :func:`orchard.wait.wait_each`."""
+        return wait.wait_any(self, containers, timeout)
+
+    def wait_all(self, containers, timeout=None):
+        return wait.wait_all(self, containers, timeout)
+
+    def launch_group(self, spec, prefix='',
+                     parallelism=bulk.DEFAULT_CONCURRENCY):
+        """Creates and starts linked containers in dependency order; see
+        :func:`orchard.group.launch_group`."""
+        return group.launch_group(self, spec, prefix, parallelism)
+
+    def container_template(self, image, **kwargs):
+        """Returns a :class:`orchard.template.ContainerTemplate` for creating
+        many containers with the same configuration."""
+        return template.ContainerTemplate(self, image, **kwargs)
@@ -52,3 +52,21 @@ class ServerError(HTTPError):
 
 class AuthenticationFailed(Exception):
     pass
+
+
+class ImagePullError(Exception):
+    pass
+
+
+class HostTimeout(Exception):
+    pass
+
+
+class ContainerTimeout(Exception):
+    pass
+
+
+class GroupLaunchError(Exception):
+    def __init__(self, message, results):
+        super(GroupLaunchError, self).__init__(message)
+        self.results = results
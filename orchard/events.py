@@ -0,0 +1,168 @@
+import logging
+import socket
+import threading
+
+from .packages.docker.utils import streams
+
+log = logging.getLogger(__name__)
+
+
+class Subscription(object):
+    def __init__(self, callback, status=None, container=None, image=None):
+        self.callback = callback
+        self.status = _as_set(status)
+        self.container = _as_set(container)
+        self.image = _as_set(image)
+
+    def matches(self, event):
+        return (
+            (self.status is None or event.get('status') in self.status) and
+            (self.container is None or event.get('id') in self.container) and
+            (self.image is None or event.get('from') in self.image)
+        )
+
+    def index_key(self):
+        # Index on the most selective filter so most subscriptions are never
+        # looked at for an unrelated event.
+        if self.container is not None:
+            return 'id', self.container
+        if self.image is not None:
+            return 'from', self.image
+        if self.status is not None:
+            return 'status', self.status
+        return None, None
+
+
+class EventDispatcher(object):
+    """Delivers Docker events to callbacks registered with :meth:`subscribe`.
+
+    Subscriptions can be filtered by event status (``'die'``, ``'start'``,
+    ...), full container ID and image; each filter takes a single value or a
+    collection. Events are delivered in order, on the thread that reads the
+    stream. Call :meth:`run` to read events on the current thread, or
+    :meth:`start` to read them on a background thread.
+
+        >>> dispatcher = EventDispatcher(host.docker())
+        >>> dispatcher.subscribe(on_die, status='die')
+        >>> dispatcher.start()
+    """
+
+    INDEX_FIELDS = ('id', 'from', 'status')
+
+    def __init__(self, client, max_size=streams.DEFAULT_MAX_MESSAGE_SIZE):
+        self.client = client
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._indexes = dict((field, {}) for field in self.INDEX_FIELDS)
+        self._unfiltered = ()
+        self._socket = None
+        self._stopped = False
+
+    def subscribe(self, callback, status=None, container=None, image=None):
+        if isinstance(container, dict):
+            container = container.get('Id')
+        subscription = Subscription(callback, status, container, image)
+        field, keys = subscription.index_key()
+
+        with self._lock:
+            if field is None:
+                self._unfiltered = self._unfiltered + (subscription,)
+            else:
+                index = self._indexes[field]
+                for key in keys:
+                    index[key] = index.get(key, ()) + (subscription,)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        field, keys = subscription.index_key()
+
+        with self._lock:
+            if field is None:
+                self._unfiltered = tuple(
+                    s for s in self._unfiltered if s is not subscription)
+                return
+
+            index = self._indexes[field]
+            for key in keys:
+                remaining = tuple(
+                    s for s in index.get(key, ()) if s is not subscription)
+                if remaining:
+                    index[key] = remaining
+                else:
+                    index.pop(key, None)
+
+    def dispatch(self, event):
+        # Index entries are replaced rather than mutated, so they can be read
+        # without holding the lock.
+        candidates = self._unfiltered
+        for field in self.INDEX_FIELDS:
+            value = event.get(field)
+            if value is not None:
+                candidates += self._indexes[field].get(value, ())
+
+        for subscription in candidates:
+            if subscription.matches(event):
+                try:
+                    subscription.callback(event)
+                except Exception:
+                    log.exception('Error in event callback')
+
+    def run(self, on_connect=None):
+        """Reads and dispatches events until the stream ends or :meth:`stop`
+        is called. ``on_connect`` is called once the stream is open, before
+        any events are dispatched; events that happen meanwhile are
+        dispatched after it returns. Returns straight away if :meth:`stop`
+        has been called since the last :meth:`reset`."""
+        if self._stopped:
+            return
+        response = self.client._events_request()
+        sock, buffered = self.client._stream_result_socket_buffered(response)
+        self._socket = sock
+
+        try:
+            # stop() may have been called while connecting, when there was no
+            # socket yet for it to shut down.
+            if self._stopped:
+                return
+            if on_connect is not None:
+                on_connect()
+            chunks = streams.iter_socket(sock, buffered)
+            for event in streams.iter_chunked_json(chunks, self.max_size):
+                self.dispatch(event)
+        except socket.error:
+            if not self._stopped:
+                raise
+        finally:
+            self._socket = None
+            sock.close()
+            self.client._release_stream(response)
+
+    def start(self):
+        self.reset()
+        thread = threading.Thread(target=self.run, name='orchard-events')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def reset(self):
+        """Clears a previous :meth:`stop`, so :meth:`run` can be called
+        again."""
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+
+def _as_set(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(value)
+    return frozenset([value])
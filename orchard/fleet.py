@@ -0,0 +1,187 @@
+import math
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from .errors import HostTimeout, ImagePullError
+from .packages.docker.utils import ProgressTracker
+from .results import Result
+
+DEFAULT_PARALLELISM = 10
+
+HostResult = Result
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Collapses concurrent calls with the same key into one: whoever comes
+    first does the work, and everyone else waits for and shares its
+    outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Returns ``(result, shared)``, or raises what ``fn`` raised."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
+
+
+_pulls = SingleFlight()
+
+
+def pull_image(host, repository, tag=None):
+    """Pulls an image onto a host and returns the final progress snapshot.
+    If the same image is already being pulled onto the host by another
+    thread, waits for that pull instead of starting a second one."""
+    key = (host.id, repository, tag)
+    return _pulls.do(key, lambda: _pull(host, repository, tag))
+
+
+def _pull(host, repository, tag):
+    tracker = ProgressTracker()
+    for message in host.docker().pull(repository, tag=tag, stream=True,
+                                      decode=True):
+        tracker.update(message)
+
+    if tracker.error is not None:
+        raise ImagePullError(tracker.error)
+    return tracker.snapshot()
+
+
+def distribute_image(hosts, repository, tag=None,
+                     parallelism=DEFAULT_PARALLELISM):
+    """Pulls an image onto every host in ``hosts``, at most ``parallelism``
+    at a time. Returns a dict mapping host names to :class:`HostResult`."""
+    results = run_on_hosts(
+        hosts, lambda host: pull_image(host, repository, tag),
+        parallelism=parallelism)
+
+    for result in results.values():
+        if result.ok:
+            result.result, result.shared = result.result
+    return results
+
+
+def fan_out(hosts, fn, timeout=None, parallelism=DEFAULT_PARALLELISM):
+    """Calls ``fn`` with each host's DockerClient, at most ``parallelism``
+    hosts at a time, and returns a dict mapping host names to
+    :class:`HostResult`.
+
+    If ``timeout`` is given, a host whose call hasn't returned that many
+    seconds after it started gets a :class:`HostTimeout` error instead of a
+    result. The call itself can't be interrupted, so it carries on in the
+    background until it finishes or its request times out. Hosts still
+    queued behind hung ones when every call should have finished, after
+    ``timeout`` seconds for each round of ``parallelism`` hosts, also get a
+    :class:`HostTimeout` and are never called.
+
+        >>> results = client.hosts.fan_out(lambda docker: docker.info())
+    """
+    return run_on_hosts(hosts, lambda host: fn(host.docker()), timeout,
+                        parallelism)
+
+
+def run_on_hosts(hosts, fn, timeout=None, parallelism=DEFAULT_PARALLELISM):
+    """Like :func:`fan_out`, but calls ``fn`` with the host itself."""
+    hosts = list(hosts)
+    if not hosts:
+        return {}
+
+    workers = max(1, min(parallelism, len(hosts)))
+    pool = ThreadPool(workers)
+    calls = [_HostCall(host, fn) for host in hosts]
+    try:
+        for call in calls:
+            call.async_result = pool.apply_async(call.run)
+    finally:
+        pool.close()
+
+    deadline = None
+    if timeout is not None:
+        rounds = int(math.ceil(len(hosts) / float(workers)))
+        deadline = time.time() + timeout * rounds
+    results = [call.wait(timeout, deadline) for call in calls]
+
+    # Don't wait for calls that timed out.
+    if all(not isinstance(result.error, HostTimeout) for result in results):
+        pool.join()
+
+    return dict((result.host.name, result) for result in results)
+
+
+class _HostCall(object):
+    def __init__(self, host, fn):
+        self.host = host
+        self.fn = fn
+        self.queued = time.time()
+        self.started = None
+        self.running = threading.Event()
+        self.cancelled = False
+        self.async_result = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        with self._lock:
+            if self.cancelled:
+                return None
+            self.started = time.time()
+            self.running.set()
+        try:
+            result = self.fn(self.host)
+            return HostResult(self.host, result=result, started=self.started,
+                              finished=time.time())
+        except Exception as e:
+            return HostResult(self.host, error=e, started=self.started,
+                              finished=time.time())
+
+    def wait(self, timeout, deadline):
+        if timeout is None:
+            return self.async_result.get()
+
+        # The timeout starts when the call does, not while it's queued
+        # behind other hosts, but it mustn't wait behind hung hosts forever.
+        self.running.wait(max(0, deadline - time.time()))
+        with self._lock:
+            if not self.running.is_set():
+                self.cancelled = True
+                return HostResult(
+                    self.host, started=self.queued, finished=time.time(),
+                    error=HostTimeout('%s was still queued after %.1fs' % (
+                        self.host.name, deadline - self.queued)))
+
+        remaining = self.started + timeout - time.time()
+        self.async_result.wait(max(0, remaining))
+        if self.async_result.ready():
+            return self.async_result.get()
+
+        return HostResult(
+            self.host, started=self.started, finished=time.time(),
+            error=HostTimeout('%s did not respond within %ss' % (
+                self.host.name, timeout)))
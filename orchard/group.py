@@ -0,0 +1,111 @@
+import threading
+
+from . import bulk
+from .errors import GroupLaunchError
+
+START_OPTIONS = frozenset(['binds', 'port_bindings', 'lxc_conf',
+                           'publish_all_ports', 'links', 'privileged'])
+
+
+def launch_group(client, spec, prefix='',
+                 parallelism=bulk.DEFAULT_CONCURRENCY):
+    """Creates and starts a group of linked containers.
+
+    ``spec`` maps container names to the keyword arguments for
+    ``create_container()`` and ``start()``, for example::
+
+        {
+            'db': {'image': 'postgres'},
+            'web': {'image': 'app', 'links': {'db': 'db'},
+                    'port_bindings': {8000: 8000}},
+        }
+
+    ``links`` can be a dict or a list of names or ``(name, alias)`` pairs.
+    Containers are created and started in dependency order, each level of
+    the dependency graph in parallel, so a container starts after every
+    container in the group it links to. ``prefix`` is prepended to the
+    names of the containers in the group.
+
+    Returns a dict mapping names to :class:`orchard.bulk.ContainerResult`,
+    whose ``result`` is the ``create_container()`` response and whose
+    ``elapsed`` is how long that container took to create and start. If any
+    container fails, every container launched so far is killed and removed
+    and :class:`GroupLaunchError` is raised, with the results so far as
+    its ``results``.
+    """
+    links = dict((name, _links(options.get('links')))
+                 for name, options in spec.items())
+    levels = dependency_levels(
+        dict((name, [linked for linked, _ in links[name] if linked in spec])
+             for name in spec))
+
+    created = {}
+    lock = threading.Lock()
+
+    def launch(name):
+        options = dict(spec[name])
+        create_options = dict((k, v) for k, v in options.items()
+                              if k not in START_OPTIONS)
+        start_options = dict((k, v) for k, v in options.items()
+                             if k in START_OPTIONS)
+        start_options['links'] = [
+            (prefix + linked if linked in spec else linked, alias)
+            for linked, alias in links[name]
+        ]
+
+        container = client.create_container(name=prefix + name,
+                                            **create_options)
+        with lock:
+            created[name] = container['Id']
+        client.start(container, **start_options)
+        return container
+
+    results = {}
+    for level in levels:
+        level_results = bulk.run_many(launch, level, parallelism,
+                                      stop_on_error=True)
+        results.update(level_results)
+
+        failed = [name for name in level
+                  if name not in level_results or not level_results[name].ok]
+        if failed:
+            _remove(client, created.values(), parallelism)
+            raise GroupLaunchError(
+                'Failed to launch %s' % ', '.join(sorted(failed)), results)
+
+    return results
+
+
+def dependency_levels(dependencies):
+    """Splits a dict mapping names to the names they depend on into a list
+    of levels, each of which depends only on earlier ones. Raises
+    ``ValueError`` if there is a cycle."""
+    remaining = dict((name, set(deps)) for name, deps in dependencies.items())
+    levels = []
+    while remaining:
+        level = sorted(name for name, deps in remaining.items() if not deps)
+        if not level:
+            raise ValueError('Circular links between %s' %
+                             ', '.join(sorted(remaining)))
+        levels.append(level)
+        for name in level:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(level)
+    return levels
+
+
+def _links(links):
+    if not links:
+        return []
+    if isinstance(links, dict):
+        return sorted(links.items())
+    return [tuple(link) if isinstance(link, (list, tuple)) else (link, link)
+            for link in links]
+
+
+def _remove(client, container_ids, parallelism):
+    container_ids = list(container_ids)
+    # Killing a container that never started fails, which is fine.
+    bulk.run_many(client.kill, container_ids, parallelism)
+    bulk.run_many(client.remove_container, container_ids, parallelism)
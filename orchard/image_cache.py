@@ -0,0 +1,152 @@
+from collections import OrderedDict
+import json
+import os
+import re
+import threading
+import time
+
+from .utils import write_if_changed
+
+DEFAULT_DIRECTORY = '~/.orchard/image-cache'
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TAG_TTL = 60
+
+FULL_ID = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ImageCache(object):
+    """Caches ``inspect_image()`` and ``history()`` results by full image ID.
+
+    An image ID always refers to the same image, so entries never go stale
+    and are only evicted to keep at most ``max_entries`` in memory. If a
+    ``directory`` is given (such as :data:`DEFAULT_DIRECTORY`), entries are
+    also written there and survive between processes.
+
+    Images looked up by tag or short ID are resolved to a full ID first;
+    because a tag can be moved to another image, a resolution is only
+    trusted for ``tag_ttl`` seconds.
+
+        >>> docker = host.docker()
+        >>> docker.image_cache = ImageCache(directory=DEFAULT_DIRECTORY)
+        >>> docker.inspect_image('ubuntu:14.04')
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None,
+                 tag_ttl=DEFAULT_TAG_TTL):
+        self.max_entries = max_entries
+        self.directory = directory and os.path.expanduser(directory)
+        self.tag_ttl = tag_ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                'misses': self.misses, 'entries': len(self._entries)}
+
+    def inspect_image(self, host, image, fetch):
+        """Returns the ``inspect_image()`` result for ``image`` on ``host``,
+        calling ``fetch(image)`` if it isn't cached."""
+        image_id = self._resolve(host, image)
+        if image_id is not None:
+            info = self._get('inspect', image_id)
+            if info is not None:
+                return info
+
+        with self._lock:
+            self.misses += 1
+        info = fetch(image)
+        image_id = info.get('id') or info.get('Id')
+        self._put('inspect', image_id, info)
+        if image_id != image:
+            with self._lock:
+                self._tags[(host, image)] = (image_id, time.time())
+        return info
+
+    def history(self, host, image, fetch, inspect):
+        """Returns the ``history()`` result for ``image`` on ``host``, calling
+        ``fetch(image_id)`` if it isn't cached. ``inspect`` is used to
+        resolve tags to IDs."""
+        image_id = self._resolve(host, image)
+        if image_id is None:
+            info = self.inspect_image(host, image, inspect)
+            image_id = info.get('id') or info.get('Id')
+
+        history = self._get('history', image_id)
+        if history is None:
+            with self._lock:
+                self.misses += 1
+            history = fetch(image_id)
+            self._put('history', image_id, history)
+        return history
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _resolve(self, host, image):
+        if FULL_ID.match(image):
+            return image
+
+        with self._lock:
+            resolved = self._tags.get((host, image))
+        if resolved is None:
+            return None
+        image_id, resolved_at = resolved
+        if time.time() - resolved_at > self.tag_ttl:
+            return None
+        return image_id
+
+    def _get(self, kind, image_id):
+        key = (kind, image_id)
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._entries[key] = value
+                self.hits += 1
+                return value
+
+        value = self._read(kind, image_id)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def _put(self, kind, image_id, value):
+        self._remember((kind, image_id), value)
+        self._write(kind, image_id, value)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, kind, image_id):
+        return os.path.join(self.directory, kind, '%s.json' % image_id)
+
+    def _read(self, kind, image_id):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(kind, image_id)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _write(self, kind, image_id, value):
+        if self.directory is None:
+            return
+        path = self._path(kind, image_id)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            if not os.path.isdir(os.path.dirname(path)):
+                raise
+        write_if_changed(path, json.dumps(value))
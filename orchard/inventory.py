@@ -0,0 +1,208 @@
+import logging
+import threading
+
+from .events import EventDispatcher
+from .packages.docker import APIError
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RESYNC_INTERVAL = 300
+RECONNECT_DELAY = 1
+
+CONTAINER_EVENTS = ('create', 'start', 'restart', 'stop', 'kill', 'die',
+                    'pause', 'unpause', 'rename', 'destroy')
+
+
+class ContainerInventory(object):
+    """An in-memory mirror of the containers on a Docker host.
+
+    The inventory is seeded with one ``containers(all=True)`` call and an
+    ``inspect_container()`` per container, then kept up to date from the
+    event stream: each container event re-inspects just that container.
+    A full resync runs every ``resync_interval`` seconds, and whenever the
+    event stream has to be reconnected, to correct any drift.
+
+    Lookups read the index directly and never touch the network.
+
+        >>> inventory = ContainerInventory(host.docker())
+        >>> inventory.start()
+        >>> inventory.get('web')['State']['Running']
+        True
+    """
+
+    def __init__(self, client, resync_interval=DEFAULT_RESYNC_INTERVAL):
+        self.client = client
+        self.resync_interval = resync_interval
+        self.dispatcher = EventDispatcher(client)
+        self.dispatcher.subscribe(self._on_event, status=CONTAINER_EVENTS)
+        self.ready = threading.Event()
+        self._first_attempt = threading.Event()
+        self._error = None
+
+        # Index entries are replaced rather than mutated, so lookups don't
+        # need the lock.
+        self._by_id = {}
+        self._by_name = {}
+        self._by_image = {}
+        self._lock = threading.Lock()
+        # Held from inspecting a container until its result is stored, so an
+        # older inspection can never overwrite a newer one.
+        self._refresh_lock = threading.RLock()
+        self._stopped = threading.Event()
+
+    def start(self, wait=True):
+        """Starts following the event stream in the background. If ``wait``
+        is true, returns once the inventory has been seeded, or raises the
+        error that stopped it from being seeded."""
+        self._stopped.clear()
+        self.dispatcher.reset()
+        for target, name in ((self._follow, 'orchard-inventory'),
+                             (self._resync_periodically, 'orchard-resync')):
+            thread = threading.Thread(target=target, name=name)
+            thread.daemon = True
+            thread.start()
+
+        if wait:
+            self._first_attempt.wait()
+            if not self.ready.is_set():
+                self.stop()
+                raise self._error
+
+    def stop(self):
+        self._stopped.set()
+        self.dispatcher.stop()
+
+    def get(self, id_or_name):
+        """Returns the ``inspect_container()`` result for a container, by
+        full ID or name, or ``None`` if there is no such container."""
+        info = self._by_id.get(id_or_name)
+        if info is None:
+            container_id = self._by_name.get(_name(id_or_name))
+            if container_id is not None:
+                info = self._by_id.get(container_id)
+        return info
+
+    def by_image(self, image):
+        """Returns the containers created from an image, given by ID or by
+        the name the containers were created with."""
+        by_id = self._by_id
+        return [by_id[container_id]
+                for container_id in self._by_image.get(image, ())
+                if container_id in by_id]
+
+    def containers(self, all=False):
+        """Returns the running containers, or every container if ``all`` is
+        true."""
+        containers = list(self._by_id.values())
+        if all:
+            return containers
+        return [info for info in containers
+                if info.get('State', {}).get('Running')]
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, id_or_name):
+        return self.get(id_or_name) is not None
+
+    def resync(self):
+        """Rebuilds the inventory from a full listing of the host."""
+        with self._refresh_lock:
+            listed = set()
+            for container in self.client.containers(all=True, trunc=False):
+                listed.add(container['Id'])
+                self.refresh(container['Id'])
+
+            for container_id in list(self._by_id):
+                if container_id not in listed:
+                    self._discard(container_id)
+
+        self.ready.set()
+        self._first_attempt.set()
+
+    def refresh(self, container_id):
+        """Re-inspects one container, dropping it if it no longer exists."""
+        with self._refresh_lock:
+            try:
+                info = self.client.inspect_container(container_id)
+            except APIError as e:
+                if e.response.status_code != 404:
+                    raise
+                self._discard(container_id)
+            else:
+                self._store(info)
+
+    def _on_event(self, event):
+        if event.get('status') == 'destroy':
+            with self._refresh_lock:
+                self._discard(event['id'])
+        else:
+            self.refresh(event['id'])
+
+    def _follow(self):
+        while not self._stopped.is_set():
+            try:
+                # Resyncing once the stream is open means nothing that
+                # happened while it was down is missed.
+                self.dispatcher.run(on_connect=self.resync)
+            except Exception as e:
+                if not self.ready.is_set():
+                    self._error = e
+                    self._first_attempt.set()
+                    return
+                log.exception('Error following container events')
+            self._stopped.wait(RECONNECT_DELAY)
+
+    def _resync_periodically(self):
+        while not self._stopped.wait(self.resync_interval):
+            if not self.ready.is_set():
+                continue
+            try:
+                self.resync()
+            except Exception:
+                log.exception('Error resyncing container inventory')
+
+    def _store(self, info):
+        # Older API versions call it 'ID'.
+        container_id = info.get('Id') or info.get('ID')
+        with self._lock:
+            old = self._by_id.get(container_id)
+            self._by_id[container_id] = info
+            self._by_name[_name(info.get('Name', ''))] = container_id
+            for image in _images(info):
+                images = self._by_image.get(image, frozenset())
+                self._by_image[image] = images | set([container_id])
+            if old is not None:
+                self._unindex(container_id, old, info)
+
+    def _discard(self, container_id):
+        with self._lock:
+            old = self._by_id.pop(container_id, None)
+            if old is not None:
+                self._unindex(container_id, old)
+
+    def _unindex(self, container_id, old, new=None):
+        """Drops the index entries for ``old`` that ``new`` doesn't share."""
+        name = _name(old.get('Name', ''))
+        if new is None or name != _name(new.get('Name', '')):
+            if self._by_name.get(name) == container_id:
+                del self._by_name[name]
+
+        for image in _images(old) - (_images(new) if new else set()):
+            remaining = (self._by_image.get(image, frozenset()) -
+                         set([container_id]))
+            if remaining:
+                self._by_image[image] = remaining
+            else:
+                self._by_image.pop(image, None)
+
+
+def _name(name):
+    return name.lstrip('/')
+
+
+def _images(info):
+    images = set([info.get('Image')])
+    images.add((info.get('Config') or {}).get('Image'))
+    images.discard(None)
+    return images
@@ -1,27 +1,51 @@
+from .. import fleet
 from ..docker_client import DockerClient
+from ..utils import write_if_changed
 from .resource import Model, Collection
 import os
+import stat
+import threading
+
+
+_docker_lock = threading.Lock()
 
 
 class Host(Model):
     attr_names = Model.attr_names + ['name', 'size', 'ipv4_address', 'client_key', 'client_cert']
 
+    _docker_client = None
+    _docker_client_key = None
+
     def docker(self):
-        self._store_certs()
-        return DockerClient(
-            base_url='https://%s:4243' % self.ipv4_address,
-            verify=self._host_ca_path(),
-            cert=(self._client_cert_path(), self._client_key_path()),
-        )
+        """Returns this host's DockerClient. The client, and with it its
+        connection pool, is reused until the host's address or
+        credentials change."""
+        key = (self.ipv4_address, self.client_key, self.client_cert)
+
+        with _docker_lock:
+            if self._docker_client is None or self._docker_client_key != key:
+                self._store_certs()
+                self._docker_client = DockerClient(
+                    base_url='https://%s:4243' % self.ipv4_address,
+                    verify=self._host_ca_path(),
+                    cert=(self._client_cert_path(), self._client_key_path()),
+                )
+                self._docker_client_key = key
+
+            return self._docker_client
 
     def _store_certs(self):
         if not os.path.exists(self._keys_path()):
-            os.makedirs(self._keys_path())
-        os.chmod(self._keys_path(), 0700)
-        with open(self._client_key_path(), 'w') as fh:
-            fh.write(self.client_key)
-        with open(self._client_cert_path(), 'w') as fh:
-            fh.write(self.client_cert)
+            try:
+                os.makedirs(self._keys_path(), 0700)
+            except OSError:
+                # Another process got there first.
+                if not os.path.isdir(self._keys_path()):
+                    raise
+        if stat.S_IMODE(os.stat(self._keys_path()).st_mode) != 0700:
+            os.chmod(self._keys_path(), 0700)
+        write_if_changed(self._client_key_path(), self.client_key)
+        write_if_changed(self._client_cert_path(), self.client_cert)
 
     def _keys_path(self):
         return os.path.expanduser('~/.orchard/host-keys')
@@ -41,3 +65,12 @@ class Host(Model):
 
 class HostCollection(Collection):
     model = Host
+
+    def distribute(self, repository, tag=None,
+                   parallelism=fleet.DEFAULT_PARALLELISM):
+        return fleet.distribute_image(self.models, repository, tag,
+                                      parallelism)
+
+    def fan_out(self, fn, timeout=None,
+                parallelism=fleet.DEFAULT_PARALLELISM):
+        return fleet.fan_out(self.models, fn, timeout, parallelism)
@@ -13,9 +13,10 @@
 #    limitations under the License.
 
 import json
+import os
 import re
 import shlex
-import struct
+import stat
 
 import requests
 import requests.exceptions
@@ -23,7 +24,7 @@ import six
 
 from .auth import auth
 from .unixconn import unixconn
-from .utils import utils
+from .utils import compression as compress, streams, transfer, utils
 
 if not six.PY3:
     import websocket
@@ -70,7 +71,8 @@ class APIError(requests.exceptions.HTTPError):
 
 class Client(requests.Session):
     def __init__(self, base_url=None, version=DEFAULT_DOCKER_API_VERSION,
-                 timeout=DEFAULT_TIMEOUT_SECONDS):
+                 timeout=DEFAULT_TIMEOUT_SECONDS,
+                 pool_maxsize=unixconn.DEFAULT_POOL_MAXSIZE, pool_block=False):
         super(Client, self).__init__()
         if base_url is None:
             base_url = "http+unix://var/run/docker.sock"
@@ -85,9 +87,17 @@ class Client(requests.Session):
         self.base_url = base_url
         self._version = version
         self._timeout = timeout
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
         self._auth_configs = auth.load_config()
 
-        self.mount('http+unix://', unixconn.UnixAdapter(base_url, timeout))
+        self.mount('http+unix://', unixconn.UnixAdapter(
+            base_url, timeout, pool_maxsize=pool_maxsize, pool_block=pool_block
+        ))
+        for prefix in ('http://', 'https://'):
+            self.mount(prefix, unixconn.ChunkedUploadAdapter(
+                pool_maxsize=pool_maxsize, pool_block=pool_block
+            ))
 
     def _set_request_timeout(self, kwargs):
         """Prepare the kwargs for an HTTP request by inserting the timeout
@@ -226,77 +236,155 @@ class Client(requests.Session):
     def _create_websocket_connection(self, url):
         return websocket.create_connection(url)
 
-    def _stream_result(self, response):
-        """Generator for straight-out, non chunked-encoded HTTP responses."""
+    def _stream_result(self, response, decode=False):
+        """Generator for straight-out HTTP responses. Yields each line as it
+        arrives or, with ``decode``, each JSON message."""
         self._raise_for_status(response)
-        for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+        if (response._content_consumed or
+                'content-length' in response.headers):
+            chunks = [response.content]
+        else:
+            chunks = self._read_stream(response)
+
+        if decode:
+            for message in streams.iter_decoded(streams.JSONDecoder, chunks):
+                yield message
+            return
+
+        # Lines are decoded if the response says what they're encoded in,
+        # as iter_lines(decode_unicode=True) would.
+        encoding = response.encoding
+        for line in streams.iter_decoded(streams.LineDecoder, chunks):
+            line = line.rstrip(b'\r')
             # filter out keep-alive new lines
             if line:
+                if encoding:
+                    line = line.decode(encoding, 'replace')
                 yield line + '\n'
 
     def _stream_result_socket(self, response):
         self._raise_for_status(response)
         return response.raw._fp.fp._sock
 
-    def _stream_helper(self, response):
-        """Generator for data coming from a chunked-encoded HTTP response."""
-        socket_fp = self._stream_result_socket(response)
-        socket_fp.setblocking(1)
-        socket = socket_fp.makefile()
-        while True:
-            size = int(socket.readline(), 16)
-            if size <= 0:
-                break
-            data = socket.readline()
-            if not data:
-                break
-            yield data
-
-    def _multiplexed_buffer_helper(self, response):
+    def _release_stream(self, response, reuse=False):
+        """Gives up a streamed response's pooled connection. With ``reuse``,
+        the body has been read to its end and the connection goes back to
+        the pool. Otherwise its socket has been taken over and can't be
+        reused, but its place in the pool still has to be freed, or a pool
+        with ``pool_block`` would wait for it forever."""
+        raw = response.raw
+        conn = getattr(raw, '_connection', None)
+        pool = getattr(raw, '_pool', None)
+        raw._connection = None
+        if conn is None or pool is None:
+            return
+        if reuse:
+            # httplib won't send another request until the response is closed.
+            raw._fp.close()
+            pool._put_conn(conn)
+        else:
+            pool._put_conn(None)
+
+    def _read_stream(self, response, chunked=None, block=False):
+        """Returns a generator of a streamed response's body, read straight
+        off the socket and dechunked if need be. When the generator finishes
+        or is closed, the connection goes back to the pool if a chunked body
+        was read to its end, and is closed otherwise."""
+        if chunked is None:
+            chunked = response.headers.get('transfer-encoding') == 'chunked'
+        socket, buffered = self._stream_result_socket_buffered(response)
+        if block:
+            socket.settimeout(None)
+        return self._iter_stream(response, socket, buffered, chunked)
+
+    def _iter_stream(self, response, socket, buffered, chunked):
+        reuse = False
+        try:
+            if not chunked:
+                for data in streams.iter_socket(socket, buffered):
+                    yield data
+                return
+
+            out = []
+            decoder = streams.ChunkedDecoder(out.append)
+            for data in streams.iter_socket(socket, buffered):
+                decoder.feed(data)
+                for chunk in out:
+                    yield chunk
+                del out[:]
+                if decoder.done:
+                    # Nothing more should follow the end of the body, so the
+                    # connection is ready for the next request.
+                    reuse = not decoder.leftover
+                    return
+        finally:
+            if not reuse:
+                socket.close()
+            self._release_stream(response, reuse)
+
+    def _stream_result_socket_buffered(self, response):
+        """Like _stream_result_socket, but also returns any body bytes that
+        were already read into the response's buffer along with the
+        headers."""
+        socket = self._stream_result_socket(response)
+        fp = response.raw._fp.fp
+        buffered = b''
+        rbuf = getattr(fp, '_rbuf', None)
+        if rbuf is not None:
+            buffered = rbuf.getvalue()
+            rbuf.seek(0)
+            rbuf.truncate()
+        return socket, buffered
+
+    def _stream_helper(self, response, decode=False):
+        """Generator for data coming from a chunked-encoded HTTP response.
+        Yields each chunk or, with ``decode``, each JSON message."""
+        chunks = self._read_stream(response, chunked=True, block=True)
+        if decode:
+            return streams.iter_decoded(
+                streams.JSONDecoder, chunks,
+                max_size=streams.DEFAULT_MAX_MESSAGE_SIZE)
+        return chunks
+
+    def _multiplexed_buffer_helper(self, response, demux=False):
         """A generator of multiplexed data blocks read from a buffered
-        response."""
+        response. With ``demux``, yields ``(stream_id, data)`` tuples."""
         buf = self._result(response, binary=True)
+        size = len(buf)
         walker = 0
-        while True:
-            if len(buf[walker:]) < 8:
-                break
-            _, length = struct.unpack_from('>BxxxL', buf[walker:])
+        while size - walker >= STREAM_HEADER_SIZE_BYTES:
+            stream_id, length = streams.STREAM_HEADER.unpack_from(buf, walker)
             start = walker + STREAM_HEADER_SIZE_BYTES
             end = start + length
             walker = end
-            yield str(buf[start:end])
+            if demux:
+                yield stream_id, buf[start:end]
+            else:
+                yield buf[start:end]
 
-    def _multiplexed_socket_stream_helper(self, response):
+    def _multiplexed_socket_stream_helper(self, response, demux=False):
         """A generator of multiplexed data blocks coming from a response
-        socket."""
-        socket = self._stream_result_socket(response)
-
-        def recvall(socket, size):
-            data = ''
-            while size > 0:
-                block = socket.recv(size)
-                if not block:
-                    return None
+        socket. With ``demux``, yields ``(stream_id, data)`` tuples."""
+        socket, buffered = self._stream_result_socket_buffered(response)
+        return self._iter_frames(response, socket, buffered, demux)
 
-                data += block
-                size -= len(block)
-            return data
-
-        while True:
-            socket.settimeout(None)
-            header = recvall(socket, STREAM_HEADER_SIZE_BYTES)
-            if not header:
-                break
-            _, length = struct.unpack('>BxxxL', header)
-            if not length:
-                break
-            data = recvall(socket, length)
-            if not data:
-                break
-            yield data
+    def _iter_frames(self, response, socket, buffered, demux):
+        try:
+            for stream_id, data in streams.FrameReader(socket, buffered):
+                if demux:
+                    yield stream_id, data
+                else:
+                    yield data
+        finally:
+            socket.close()
+            self._release_stream(response)
+
+    def _is_multiplexed(self):
+        # Stream multi-plexing was introduced in API v1.6.
+        return utils.compare_version('1.6', self._version) >= 0
 
-    def attach(self, container, stdout=True, stderr=True,
-               stream=False, logs=False):
+    def _attach_request(self, container, stdout=True, stderr=True,
+                        stream=False, logs=False, stream_response=None):
         if isinstance(container, dict):
             container = container.get('Id')
         params = {
@@ -305,16 +393,56 @@ class Client(requests.Session):
             'stderr': stderr and 1 or 0,
             'stream': stream and 1 or 0,
         }
+        if stream_response is None:
+            stream_response = stream
         u = self._url("/containers/{0}/attach".format(container))
-        response = self._post(u, params=params, stream=stream)
+        return self._post(u, params=params, stream=stream_response)
 
-        # Stream multi-plexing was introduced in API v1.6.
-        if utils.compare_version('1.6', self._version) < 0:
+    def attach(self, container, stdout=True, stderr=True,
+               stream=False, logs=False, demux=False):
+        response = self._attach_request(container, stdout, stderr, stream,
+                                        logs)
+
+        if not self._is_multiplexed():
+            if stream and demux:
+                return ((streams.STDOUT, line)
+                        for line in self._stream_result(response))
             return stream and self._stream_result(response) or \
                 self._result(response, binary=True)
 
-        return stream and self._multiplexed_socket_stream_helper(response) or \
-            ''.join([x for x in self._multiplexed_buffer_helper(response)])
+        if stream:
+            return self._multiplexed_socket_stream_helper(response, demux)
+        if demux:
+            out = {streams.STDOUT: [], streams.STDERR: []}
+            for stream_id, data in self._multiplexed_buffer_helper(response,
+                                                                   True):
+                out.setdefault(stream_id, []).append(data)
+            return (b''.join(out[streams.STDOUT]),
+                    b''.join(out[streams.STDERR]))
+        return b''.join(self._multiplexed_buffer_helper(response))
+
+    def attach_to(self, container, stdout=None, stderr=None, stream=False,
+                  logs=False, chunk_size=streams.READ_BUFFER_SIZE):
+        """Writes a container's output to the ``stdout`` and ``stderr``
+        file-like objects as it is read, without holding the whole output in
+        memory. Only the streams given a file are requested."""
+        response = self._attach_request(container, stdout is not None,
+                                        stderr is not None, stream=stream,
+                                        logs=logs, stream_response=True)
+        self._raise_for_status(response)
+
+        if self._is_multiplexed():
+            def write(stream_id, data):
+                sink = stderr if stream_id == streams.STDERR else stdout
+                if sink is not None:
+                    sink.write(data)
+            decoder = streams.FrameDecoder(write)
+        else:
+            decoder = streams.RawDecoder(
+                lambda _, data: (stdout or stderr).write(data))
+
+        for chunk in response.iter_content(chunk_size):
+            decoder.feed(chunk)
 
     def attach_socket(self, container, params=None, ws=False):
         if params is None:
@@ -329,21 +457,36 @@ class Client(requests.Session):
         if isinstance(container, dict):
             container = container.get('Id')
         u = self._url("/containers/{0}/attach".format(container))
-        return self._stream_result_socket(self.post(
-            u, None, params=self._attach_params(params), stream=True))
+        response = self.post(u, None, params=self._attach_params(params),
+                             stream=True)
+        socket = self._stream_result_socket(response)
+        # The socket now belongs to the caller.
+        self._release_stream(response)
+        return socket
 
     def build(self, path=None, tag=None, quiet=False, fileobj=None,
-              nocache=False, rm=False, stream=False, timeout=None):
+              nocache=False, rm=False, stream=False, timeout=None,
+              decode=False, context_cache=None, deterministic=False,
+              compression=None, compression_level=None):
         remote = context = headers = None
         if path is None and fileobj is None:
             raise Exception("Either path or fileobj needs to be provided.")
+        if compression is not None:
+            compress.check_method(compression)
 
         if fileobj is not None:
-            context = utils.mkbuildcontext(fileobj)
+            context = utils.mkbuildcontext(fileobj, deterministic)
         elif path.startswith(('http://', 'https://', 'git://', 'github.com/')):
             remote = path
         else:
-            context = utils.tar(path)
+            excludes = utils.read_dockerignore(path)
+            if context_cache is not None:
+                context = context_cache.open(path, excludes, deterministic)
+            else:
+                # Stream the context as it's archived, so tarring overlaps
+                # with the upload.
+                context = utils.tar_stream(path, excludes=excludes,
+                                           deterministic=deterministic)
 
         u = self._url('/build')
         params = {
@@ -353,22 +496,33 @@ class Client(requests.Session):
             'nocache': nocache,
             'rm': rm
         }
+        source = context
         if context is not None:
             headers = {'Content-Type': 'application/tar'}
+            if compression is not None:
+                # The daemon detects compressed contexts by their contents,
+                # so no header is needed.
+                if hasattr(source, 'read'):
+                    chunks = utils.iter_file(source)
+                else:
+                    chunks = source
+                context = compress.compress_stream(
+                    chunks, compression, compression_level)
 
-        response = self._post(
-            u,
-            data=context,
-            params=params,
-            headers=headers,
-            stream=stream,
-            timeout=timeout,
-        )
-
-        if context is not None:
-            context.close()
+        try:
+            response = self._post(
+                u,
+                data=context,
+                params=params,
+                headers=headers,
+                stream=stream,
+                timeout=timeout,
+            )
+        finally:
+            if source is not None:
+                source.close()
         if stream or utils.compare_version('1.8', self._version) >= 0:
-            return self._stream_result(response)
+            return self._stream_result(response, decode=decode)
         else:
             output = self._result(response)
             srch = r'Successfully built ([0-9a-f]+)'
@@ -417,6 +571,12 @@ class Client(requests.Session):
         self._raise_for_status(res)
         return res.raw
 
+    def copy_to(self, container, resource, dest, paths=None, progress=None):
+        """Streams ``resource`` from a container into ``dest``; see
+        :meth:`export_to`."""
+        return self._save_archive(self.copy(container, resource), dest,
+                                  paths, progress)
+
     def create_container(self, image, command=None, hostname=None, user=None,
                          detach=False, stdin_open=False, tty=False,
                          mem_limit=0, ports=None, environment=None, dns=None,
@@ -445,22 +605,14 @@ class Client(requests.Session):
         return self._result(self._get(self._url("/containers/{0}/changes".
                             format(container))), True)
 
-    def events(self):
-        u = self._url("/events")
-
-        socket = self._stream_result_socket(self.get(u, stream=True))
+    def _events_request(self):
+        return self.get(self._url("/events"), stream=True)
 
-        while True:
-            chunk = socket.recv(4096)
-            if chunk:
-                # Messages come in the format of length, data, newline.
-                length, data = chunk.split("\n", 1)
-                length = int(length, 16)
-                if length > len(data):
-                    data += socket.recv(length - len(data))
-                yield json.loads(data)
-            else:
-                break
+    def events(self, max_size=streams.DEFAULT_MAX_MESSAGE_SIZE):
+        chunks = self._read_stream(self._events_request(), chunked=True)
+        for event in streams.iter_decoded(streams.JSONDecoder, chunks,
+                                          max_size=max_size):
+            yield event
 
     def export(self, container):
         if isinstance(container, dict):
@@ -470,6 +622,28 @@ class Client(requests.Session):
         self._raise_for_status(res)
         return res.raw
 
+    def export_to(self, container, dest, paths=None, progress=None):
+        """Streams a container's filesystem into ``dest`` without holding it
+        in memory. If ``dest`` is a directory the archive is extracted into
+        it; otherwise it is written as a tar file to ``dest``, a path or a
+        file-like object. ``paths`` is a list of glob patterns selecting
+        which entries to keep. ``progress(stats)`` is called as data arrives.
+        Returns a :class:`utils.transfer.TransferStats` with byte and entry
+        counts and rates."""
+        return self._save_archive(self.export(container), dest, paths,
+                                  progress)
+
+    def _save_archive(self, raw, dest, paths, progress):
+        try:
+            if hasattr(dest, 'write'):
+                return transfer.copy_stream(raw, dest, paths, progress)
+            if os.path.isdir(dest):
+                return transfer.extract_stream(raw, dest, paths, progress)
+            with open(dest, 'wb') as f:
+                return transfer.copy_stream(raw, f, paths, progress)
+        finally:
+            raw.close()
+
     def history(self, image):
         res = self._get(self._url("/images/{0}/history".format(image)))
         self._raise_for_status(res)
@@ -491,7 +665,13 @@ class Client(requests.Session):
             return [x['Id'] for x in res]
         return res
 
-    def import_image(self, src=None, repository=None, tag=None, image=None):
+    def import_image(self, src=None, repository=None, tag=None, image=None,
+                     progress=None):
+        """Imports an image from ``src``: a path to a local tarball, a URL, a
+        file-like object or an iterator of byte strings. Local data is
+        streamed, so memory use doesn't grow with the size of the tarball.
+        ``progress(sent, total)`` is called as it is uploaded; ``total`` is
+        None when the size isn't known up front."""
         u = self._url("/images/create")
         params = {
             'repo': repository,
@@ -499,20 +679,17 @@ class Client(requests.Session):
         }
 
         if src:
-            try:
-                # XXX: this is ways not optimal but the only way
-                # for now to import tarballs through the API
-                fic = open(src)
-                data = fic.read()
-                fic.close()
-                src = "-"
-            except IOError:
-                # file does not exists or not a file (URL)
-                data = None
             if isinstance(src, six.string_types):
-                params['fromSrc'] = src
-                return self._result(self._post(u, data=data, params=params))
-            return self._result(self._post(u, data=src, params=params))
+                if not os.path.isfile(src):
+                    # Not a local file, so let the daemon fetch the URL.
+                    params['fromSrc'] = src
+                    return self._result(self._post(u, params=params))
+
+                with open(src, 'rb') as fileobj:
+                    return self._import_image_data(
+                        u, params, fileobj, os.path.getsize(src), progress)
+
+            return self._import_image_data(u, params, src, None, progress)
 
         if image:
             params['fromImage'] = image
@@ -520,6 +697,30 @@ class Client(requests.Session):
 
         raise Exception("Must specify a src or image")
 
+    def _import_image_data(self, url, params, src, size, progress):
+        params['fromSrc'] = '-'
+
+        if size is None and hasattr(src, 'fileno'):
+            try:
+                st = os.fstat(src.fileno())
+                if stat.S_ISREG(st.st_mode):
+                    size = st.st_size - src.tell()
+            except (OSError, IOError, ValueError):
+                pass
+
+        if size is not None and hasattr(src, 'read'):
+            # A known length is sent with Content-Length and read from the
+            # file in small blocks.
+            data = utils.ProgressReader(src, size, progress)
+        else:
+            if hasattr(src, 'read'):
+                src = utils.iter_file(src)
+            # Unknown lengths are sent with chunked transfer encoding.
+            data = utils.iter_progress(src, progress, size)
+
+        return self._result(self._post(url, data=data, params=params,
+                                       timeout=None))
+
     def info(self):
         return self._result(self._get(self._url("/info")),
                             True)
@@ -584,15 +785,23 @@ class Client(requests.Session):
             self._auth_configs[registry] = req_data
         return self._result(response, json=True)
 
-    def logs(self, container, stdout=True, stderr=True, stream=False):
+    def logs(self, container, stdout=True, stderr=True, stream=False,
+             demux=False):
         return self.attach(
             container,
             stdout=stdout,
             stderr=stderr,
             stream=stream,
-            logs=True
+            logs=True,
+            demux=demux
         )
 
+    def logs_to(self, container, stdout=None, stderr=None):
+        """Writes a container's logs to the ``stdout`` and ``stderr``
+        file-like objects without holding them in memory."""
+        return self.attach_to(container, stdout=stdout, stderr=stderr,
+                              logs=True)
+
     def port(self, container, private_port):
         if isinstance(container, dict):
             container = container.get('Id')
@@ -608,7 +817,7 @@ class Client(requests.Session):
 
         return h_ports
 
-    def pull(self, repository, tag=None, stream=False):
+    def _pull_request(self, repository, tag=None, stream=False):
         registry, repo_name = auth.resolve_repository_name(repository)
         if repo_name.count(":") == 1:
             repository, tag = repository.rsplit(":", 1)
@@ -632,15 +841,21 @@ class Client(requests.Session):
             if authcfg:
                 headers['X-Registry-Auth'] = auth.encode_header(authcfg)
 
-        response = self._post(self._url('/images/create'), params=params,
-                              headers=headers, stream=stream, timeout=None)
+        return self._post(self._url('/images/create'), params=params,
+                          headers=headers, stream=stream, timeout=None)
+
+    def pull(self, repository, tag=None, stream=False, decode=False):
+        """Pulls an image. With ``stream``, returns a generator of progress
+        messages, decoded from JSON if ``decode`` is set; pass those to
+        :func:`utils.progress.progress_snapshots` for aggregate progress."""
+        response = self._pull_request(repository, tag, stream)
 
         if stream:
-            return self._stream_helper(response)
+            return self._stream_helper(response, decode)
         else:
             return self._result(response)
 
-    def push(self, repository, stream=False):
+    def _push_request(self, repository, stream=False):
         registry, repo_name = auth.resolve_repository_name(repository)
         u = self._url("/images/{0}/push".format(repository))
         headers = {}
@@ -658,11 +873,14 @@ class Client(requests.Session):
             if authcfg:
                 headers['X-Registry-Auth'] = auth.encode_header(authcfg)
 
-            response = self._post_json(u, None, headers=headers, stream=stream)
+            return self._post_json(u, None, headers=headers, stream=stream)
         else:
-            response = self._post_json(u, authcfg, stream=stream)
+            return self._post_json(u, authcfg, stream=stream)
+
+    def push(self, repository, stream=False, decode=False):
+        response = self._push_request(repository, stream)
 
-        return stream and self._stream_helper(response) \
+        return stream and self._stream_helper(response, decode) \
             or self._result(response)
 
     def remove_container(self, container, v=False, link=False):
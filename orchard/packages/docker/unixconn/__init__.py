@@ -1 +1 @@
-from .unixconn import UnixAdapter  # flake8: noqa
+from .unixconn import ChunkedUploadAdapter, UnixAdapter  # flake8: noqa
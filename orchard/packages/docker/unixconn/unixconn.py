@@ -20,10 +20,88 @@ else:
 import requests.adapters
 import socket
 
+import requests.exceptions
+
 try:
     import requests.packages.urllib3.connectionpool as connectionpool
+    from requests.packages.urllib3 import exceptions as urllib3_exceptions
+    from requests.packages.urllib3._collections import RecentlyUsedContainer
+    from requests.packages.urllib3.util import Timeout
 except ImportError:
     import urllib3.connectionpool as connectionpool
+    from urllib3 import exceptions as urllib3_exceptions
+    from urllib3._collections import RecentlyUsedContainer
+    from urllib3.util import Timeout
+
+DEFAULT_NUM_POOLS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class ChunkedBody(object):
+    """File-like view of an iterable request body, chunk-encoded, for httplib
+    to send. Each ``read()`` returns one whole chunk, whatever size is asked
+    for."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._done = False
+
+    def read(self, size=-1):
+        if self._done:
+            return b''
+        for chunk in self._chunks:
+            if chunk:
+                header = '{0:x}\r\n'.format(len(chunk)).encode('ascii')
+                return header + chunk + b'\r\n'
+        self._done = True
+        return b'0\r\n\r\n'
+
+
+class ChunkedUploadAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that sends request bodies of unknown length, such as build
+    contexts, through the connection pool like any other request.
+
+    requests sends those on a connection it takes from the pool itself,
+    passing a Timeout where the pool expects seconds (which fails if
+    ``pool_block`` is set), and puts the connection back before the response
+    has been read, so another request can pick it up mid-stream.
+    """
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        if request.body is None or 'Content-Length' in request.headers:
+            return super(ChunkedUploadAdapter, self).send(
+                request, stream=stream, timeout=timeout, verify=verify,
+                cert=cert, proxies=proxies)
+
+        conn = self.get_connection(request.url, proxies)
+        self.cert_verify(conn, request.url, verify, cert)
+        url = self.request_url(request, proxies)
+        self.add_headers(request)
+
+        if stream:
+            timeout = Timeout(connect=timeout)
+        else:
+            timeout = Timeout(connect=timeout, read=timeout)
+
+        try:
+            raw = conn.urlopen(
+                method=request.method, url=url,
+                body=ChunkedBody(request.body), headers=request.headers,
+                redirect=False, assert_same_host=False, preload_content=False,
+                decode_content=False, retries=self.max_retries,
+                timeout=timeout)
+        except (socket.error, urllib3_exceptions.MaxRetryError) as e:
+            raise requests.exceptions.ConnectionError(e)
+        except urllib3_exceptions.SSLError as e:
+            raise requests.exceptions.SSLError(e)
+        except urllib3_exceptions.TimeoutError as e:
+            raise requests.exceptions.Timeout(e)
+
+        response = self.build_response(request, raw)
+        if not stream:
+            response.content
+        return response
 
 
 class UnixHTTPConnection(httplib.HTTPConnection, object):
@@ -39,19 +117,14 @@ class UnixHTTPConnection(httplib.HTTPConnection, object):
         sock.connect(self.base_url.replace("http+unix:/", ""))
         self.sock = sock
 
-    def _extract_path(self, url):
-        #remove the base_url entirely..
-        return url.replace(self.base_url, "")
-
-    def request(self, method, url, **kwargs):
-        url = self._extract_path(self.unix_socket)
-        super(UnixHTTPConnection, self).request(method, url, **kwargs)
-
 
 class UnixHTTPConnectionPool(connectionpool.HTTPConnectionPool):
-    def __init__(self, base_url, socket_path, timeout=60):
+    def __init__(self, base_url, socket_path, timeout=60,
+                 maxsize=DEFAULT_POOL_MAXSIZE, block=False):
         connectionpool.HTTPConnectionPool.__init__(self, 'localhost',
-                                                   timeout=timeout)
+                                                   timeout=timeout,
+                                                   maxsize=maxsize,
+                                                   block=block)
         self.base_url = base_url
         self.socket_path = socket_path
         self.timeout = timeout
@@ -61,11 +134,45 @@ class UnixHTTPConnectionPool(connectionpool.HTTPConnectionPool):
                                   self.timeout)
 
 
-class UnixAdapter(requests.adapters.HTTPAdapter):
-    def __init__(self, base_url, timeout=60):
+class UnixAdapter(ChunkedUploadAdapter):
+    """Transport adapter for ``http+unix://`` URLs.
+
+    Connection pools are cached per socket path, so keep-alive connections
+    to the daemon are reused across requests. ``pool_maxsize`` bounds the
+    number of connections kept per socket; with ``pool_block`` set, callers
+    wait for a free connection instead of opening a throwaway one.
+    """
+
+    def __init__(self, base_url, timeout=60, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False):
         self.base_url = base_url
+        self.socket_path = base_url.replace("http+unix:/", "")
         self.timeout = timeout
-        super(UnixAdapter, self).__init__()
-
-    def get_connection(self, socket_path, proxies=None):
-        return UnixHTTPConnectionPool(self.base_url, socket_path, self.timeout)
+        self.pools = RecentlyUsedContainer(
+            DEFAULT_NUM_POOLS, dispose_func=lambda pool: pool.close()
+        )
+        super(UnixAdapter, self).__init__(pool_maxsize=pool_maxsize,
+                                          pool_block=pool_block)
+
+    def get_connection(self, url, proxies=None):
+        with self.pools.lock:
+            pool = self.pools.get(self.socket_path)
+            if pool is not None:
+                return pool
+
+            pool = UnixHTTPConnectionPool(self.base_url, self.socket_path,
+                                          self.timeout,
+                                          maxsize=self._pool_maxsize,
+                                          block=self._pool_block)
+            self.pools[self.socket_path] = pool
+
+        return pool
+
+    def request_url(self, request, proxies):
+        # The socket path is part of the URL, so strip the base_url to get
+        # the path the daemon expects.
+        return request.url.replace(self.base_url, "")
+
+    def close(self):
+        self.pools.clear()
+        super(UnixAdapter, self).close()
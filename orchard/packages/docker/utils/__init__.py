@@ -1,3 +1,14 @@
 from .utils import (
-    compare_version, convert_port_bindings, mkbuildcontext, ping, tar
+    ProgressReader, compare_version, convert_port_bindings, is_excluded,
+    iter_file, iter_progress, mkbuildcontext, normalize_tarinfo, ping,
+    read_dockerignore, tar, tar_entries, tar_entries_stream, tar_stream
 ) # flake8: noqa
+from .context import BuildContextCache, context_digest # flake8: noqa
+from .streams import (
+    ChunkedDecoder, FrameDecoder, FrameReader, JSONDecoder, LineDecoder,
+    RawDecoder, StreamDecodeError, chunked_json_decoder, demux,
+    iter_chunked_json, iter_decoded, iter_socket
+) # flake8: noqa
+from .compression import compress_stream # flake8: noqa
+from .transfer import TransferStats, copy_stream, extract_stream # flake8: noqa
+from .progress import ProgressTracker, progress_snapshots # flake8: noqa
@@ -0,0 +1,101 @@
+# Copyright 2013 dotCloud inc.
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Parallel block compression for build contexts.
+
+The input is cut into fixed-size blocks which are compressed independently
+on a pool of threads (zlib and lzma release the GIL while they work) and
+written out in order as a sequence of complete gzip members or xz streams.
+Both formats allow concatenation, so the result decompresses as a single
+stream. At most ``2 * workers`` blocks are in memory at once.
+"""
+
+import collections
+import multiprocessing
+import struct
+import zlib
+from multiprocessing.pool import ThreadPool
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+from .utils import _coalesce
+
+GZIP = 'gzip'
+XZ = 'xz'
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_LEVEL = 6
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def gzip_block(data, level=DEFAULT_LEVEL):
+    """Compresses ``data`` into one complete gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    trailer = struct.pack('<LL', zlib.crc32(data) & 0xffffffff,
+                          len(data) & 0xffffffff)
+    return GZIP_HEADER + body + trailer
+
+
+def xz_block(data, level=DEFAULT_LEVEL):
+    """Compresses ``data`` into one complete xz stream."""
+    return lzma.compress(data, preset=level)
+
+
+COMPRESSORS = {
+    GZIP: gzip_block,
+    XZ: xz_block,
+}
+
+
+def check_method(method):
+    """Raises an error if ``method`` isn't a compression method that can be
+    used here. :func:`compress_stream` only checks once it's first read."""
+    if method not in COMPRESSORS:
+        raise ValueError('Unknown compression method: {0}'.format(method))
+    if method == XZ and lzma is None:
+        raise RuntimeError('xz compression needs the lzma module '
+                           '(backports.lzma on Python 2)')
+
+
+def compress_stream(chunks, method=GZIP, level=None, workers=None,
+                    block_size=DEFAULT_BLOCK_SIZE):
+    """Generator of the ``method``-compressed form of an iterable of byte
+    strings, compressed on ``workers`` threads (one per CPU by default)."""
+    check_method(method)
+
+    compress = COMPRESSORS[method]
+    if level is None:
+        level = DEFAULT_LEVEL
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    pool = ThreadPool(workers)
+    pending = collections.deque()
+    try:
+        for block in _coalesce(chunks, block_size):
+            pending.append(pool.apply_async(compress, (block, level)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
@@ -0,0 +1,121 @@
+# Copyright 2013 dotCloud inc.
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import hashlib
+import os
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from . import utils
+
+DEFAULT_HASH_WORKERS = 4
+DEFAULT_MAX_ENTRIES = 20
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def context_digest(entries, workers=DEFAULT_HASH_WORKERS):
+    """Returns a digest of everything that goes into a tar archive of
+    ``entries``, as returned by :func:`utils.tar_entries`. File contents are
+    hashed on ``workers`` threads."""
+    files = [full_path for full_path, info in entries if info.isreg()]
+    pool = ThreadPool(workers)
+    try:
+        hashes = dict(zip(files, pool.map(hash_file, files)))
+    finally:
+        pool.close()
+        pool.join()
+
+    digest = hashlib.sha256()
+    for full_path, info in entries:
+        digest.update(repr((
+            info.name, info.type, info.mode, info.uid, info.gid, info.mtime,
+            info.size, info.linkname, hashes.get(full_path),
+        )).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class BuildContextCache(object):
+    """Stores build context tarballs under ``directory``, named by the digest
+    of their inputs, so an unchanged tree is only archived once.
+
+    Pass one to ``Client.build(path, context_cache=...)``. The most recently
+    used ``max_entries`` tarballs are kept.
+    """
+
+    def __init__(self, directory, max_entries=DEFAULT_MAX_ENTRIES,
+                 workers=DEFAULT_HASH_WORKERS):
+        self.directory = os.path.expanduser(directory)
+        self.max_entries = max_entries
+        self.workers = workers
+
+    def open(self, path, excludes=None, deterministic=False):
+        """Returns an open file containing the build context for ``path``,
+        archiving it first if it isn't already cached."""
+        # The entries are needed twice, for the digest and the tarball.
+        entries = list(utils.tar_entries(path, excludes, deterministic))
+        cached = self._path(context_digest(entries, self.workers))
+
+        if os.path.exists(cached):
+            os.utime(cached, None)
+        else:
+            self._store(entries, cached)
+            self._evict()
+
+        return open(cached, 'rb')
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest + '.tar')
+
+    def _store(self, entries, cached):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        # Write to a temporary file and rename it into place, so concurrent
+        # builds never see a partial tarball.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in utils.tar_entries_stream(entries):
+                    f.write(chunk)
+            os.rename(tmp_path, cached)
+        except:
+            os.unlink(tmp_path)
+            raise
+
+    def _evict(self):
+        tarballs = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith('.tar')
+        ]
+        if len(tarballs) <= self.max_entries:
+            return
+
+        tarballs.sort(key=os.path.getmtime, reverse=True)
+        for stale in tarballs[self.max_entries:]:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
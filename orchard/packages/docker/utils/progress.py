@@ -0,0 +1,118 @@
+# Copyright 2013 dotCloud inc.
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Aggregation of the progress messages sent by ``pull()`` and ``push()``."""
+
+import time
+
+DEFAULT_INTERVAL = 0.5
+
+WAITING = 'waiting'
+DOWNLOADING = 'downloading'
+DOWNLOADED = 'downloaded'
+EXTRACTING = 'extracting'
+UPLOADING = 'uploading'
+DONE = 'done'
+
+STATES = {
+    'Pulling fs layer': WAITING,
+    'Pulling metadata': WAITING,
+    'Downloading': DOWNLOADING,
+    'Download complete': DOWNLOADED,
+    'Extracting': EXTRACTING,
+    'Pull complete': DONE,
+    'Already exists': DONE,
+    'Buffering to disk': UPLOADING,
+    'Pushing': UPLOADING,
+    'Pushed': DONE,
+    'Image already pushed, skipping': DONE,
+}
+
+
+class ProgressTracker(object):
+    """Keeps per-layer state from decoded pull/push messages.
+
+    Feed each message to :meth:`update` and call :meth:`snapshot` for the
+    aggregate state: the overall ``status``, any ``error``, byte counts over
+    all layers, how many layers are done, and a ``layers`` dict mapping each
+    layer ID to its ``state``, ``status``, ``current`` and ``total``.
+    """
+
+    def __init__(self):
+        self.layers = {}
+        self.status = None
+        self.error = None
+
+    def update(self, message):
+        if 'error' in message:
+            self.error = message['error']
+            return
+
+        layer_id = message.get('id')
+        status = message.get('status')
+        layer = self.layers.get(layer_id) if layer_id else None
+
+        if layer is None:
+            if layer_id is None or status not in STATES:
+                # Messages about the image as a whole, not a layer.
+                self.status = status
+                return
+            layer = self.layers[layer_id] = {
+                'state': WAITING, 'status': None, 'current': 0, 'total': 0,
+            }
+
+        layer['status'] = status
+        layer['state'] = STATES.get(status, layer['state'])
+
+        detail = message.get('progressDetail') or {}
+        if 'current' in detail:
+            layer['current'] = detail['current']
+        if detail.get('total'):
+            layer['total'] = detail['total']
+        if layer['state'] in (DOWNLOADED, DONE) and layer['total']:
+            layer['current'] = layer['total']
+
+    def snapshot(self):
+        layers = dict((k, dict(v)) for k, v in self.layers.items())
+        return {
+            'status': self.status,
+            'error': self.error,
+            'layers': layers,
+            'layers_total': len(layers),
+            'layers_done': sum(
+                1 for l in layers.values() if l['state'] == DONE),
+            'current': sum(l['current'] for l in layers.values()),
+            'total': sum(l['total'] for l in layers.values()),
+        }
+
+
+def progress_snapshots(messages, interval=DEFAULT_INTERVAL, tracker=None):
+    """Generator of aggregate snapshots from an iterable of decoded
+    pull/push messages, at most one every ``interval`` seconds plus a final
+    one when the stream ends."""
+    tracker = tracker or ProgressTracker()
+    last = None
+    pending = False
+
+    for message in messages:
+        tracker.update(message)
+        pending = True
+        now = time.time()
+        if last is None or now - last >= interval:
+            last = now
+            pending = False
+            yield tracker.snapshot()
+
+    if pending:
+        yield tracker.snapshot()
@@ -0,0 +1,302 @@
+# Copyright 2013 dotCloud inc.
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Incremental decoders for the streams the daemon sends back.
+
+Each decoder is fed whatever bytes happen to arrive with ``feed()`` and
+invokes its callback once per complete unit, so it doesn't matter how the
+stream is split across reads.
+"""
+
+import codecs
+import json
+import struct
+
+import six
+
+STREAM_HEADER_SIZE_BYTES = 8
+STREAM_HEADER = struct.Struct('>BxxxL')
+READ_BUFFER_SIZE = 64 * 1024
+DEFAULT_MAX_MESSAGE_SIZE = 1024 * 1024
+
+STDIN = 0
+STDOUT = 1
+STDERR = 2
+
+
+class StreamDecodeError(ValueError):
+    pass
+
+
+def _check_size(size, max_size):
+    if max_size is not None and size > max_size:
+        raise StreamDecodeError(
+            'Buffered {0} bytes, more than the limit of {1}'.format(
+                size, max_size))
+
+
+class FrameDecoder(object):
+    """Decodes a multiplexed attach/logs stream into
+    ``callback(stream_id, data)`` calls."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._buf = bytearray()
+
+    def feed(self, data):
+        buf = self._buf
+        buf.extend(data)
+        offset = 0
+        while len(buf) - offset >= STREAM_HEADER_SIZE_BYTES:
+            stream_id, length = STREAM_HEADER.unpack_from(buf, offset)
+            start = offset + STREAM_HEADER_SIZE_BYTES
+            end = start + length
+            if end > len(buf):
+                break
+            self.callback(stream_id, bytes(buf[start:end]))
+            offset = end
+        del buf[:offset]
+
+
+class RawDecoder(object):
+    """Passes a non-multiplexed stream straight through as stdout."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def feed(self, data):
+        if data:
+            self.callback(STDOUT, bytes(data))
+
+
+class ChunkedDecoder(object):
+    """Decodes a chunked transfer-encoded body into ``callback(data)`` calls,
+    one per chunk. Raises :class:`StreamDecodeError` if a chunk is larger than
+    ``max_size``.
+
+    ``done`` is set once the last chunk and any trailer have been read, after
+    which ``leftover`` holds whatever was fed past the end of the body."""
+
+    def __init__(self, callback, max_size=None):
+        self.callback = callback
+        self.max_size = max_size
+        self.done = False
+        self._buf = bytearray()
+        self._remaining = None
+        self._trailer = False
+
+    @property
+    def leftover(self):
+        return bytes(self._buf) if self.done else b''
+
+    def feed(self, data):
+        buf = self._buf
+        buf.extend(data)
+        offset = 0
+        while not self.done:
+            if self._remaining is None:
+                eol = buf.find(b'\r\n', offset)
+                if eol < 0:
+                    _check_size(len(buf) - offset, self.max_size)
+                    break
+                line = buf[offset:eol]
+                offset = eol + 2
+                if self._trailer:
+                    # The trailer headers, if any, end with an empty line.
+                    if not line:
+                        self.done = True
+                    continue
+                size = line.split(b';', 1)[0].strip()
+                try:
+                    self._remaining = int(bytes(size), 16)
+                except ValueError:
+                    raise StreamDecodeError(
+                        'Invalid chunk size: {0!r}'.format(bytes(size)))
+                _check_size(self._remaining, self.max_size)
+                if self._remaining == 0:
+                    self._remaining = None
+                    self._trailer = True
+                    continue
+            # Each chunk is followed by a CRLF which isn't part of the data.
+            end = offset + self._remaining
+            if len(buf) < end + 2:
+                break
+            self.callback(bytes(buf[offset:end]))
+            offset = end + 2
+            self._remaining = None
+        del buf[:offset]
+
+
+class LineDecoder(object):
+    """Splits a byte stream into ``callback(line)`` calls, one per line,
+    without the trailing newline. Call ``flush()`` at the end of the stream
+    to emit a final unterminated line."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._buf = bytearray()
+
+    def feed(self, data):
+        buf = self._buf
+        start = len(buf)
+        buf.extend(data)
+        offset = 0
+        while True:
+            eol = buf.find(b'\n', start)
+            if eol < 0:
+                break
+            self.callback(bytes(buf[offset:eol]))
+            offset = start = eol + 1
+        del buf[:offset]
+
+    def flush(self):
+        if self._buf:
+            self.callback(bytes(self._buf))
+            del self._buf[:]
+
+
+class JSONDecoder(object):
+    """Decodes a sequence of concatenated JSON documents into
+    ``callback(obj)`` calls. Documents may be split across feeds. Raises
+    :class:`StreamDecodeError` if an incomplete document grows beyond
+    ``max_size`` characters."""
+
+    def __init__(self, callback, max_size=None):
+        self.callback = callback
+        self.max_size = max_size
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buf = six.text_type()
+
+    def feed(self, data):
+        if isinstance(data, six.binary_type):
+            data = self._text.decode(data)
+        buf = self._buf + data
+        offset = 0
+        while True:
+            while offset < len(buf) and buf[offset].isspace():
+                offset += 1
+            if offset == len(buf):
+                break
+            try:
+                obj, offset = self._decoder.raw_decode(buf, offset)
+            except ValueError:
+                # Incomplete document; wait for more data.
+                break
+            self.callback(obj)
+        self._buf = buf[offset:]
+        _check_size(len(self._buf), self.max_size)
+
+
+def iter_socket(socket, buffered=b'', chunk_size=READ_BUFFER_SIZE):
+    """Generator of data read from a socket, starting with any ``buffered``
+    bytes. Each ``recv`` returns as soon as some data is available, so large
+    reads don't add latency to slow streams."""
+    if buffered:
+        yield buffered
+    while True:
+        data = socket.recv(chunk_size)
+        if not data:
+            return
+        yield data
+
+
+def iter_decoded(decoder_class, chunks, **kwargs):
+    """Runs an iterable of byte strings through a decoder, yielding each unit
+    it produces as soon as it is complete."""
+    out = []
+    decoder = decoder_class(out.append, **kwargs)
+    for data in chunks:
+        decoder.feed(data)
+        for item in out:
+            yield item
+        del out[:]
+        if getattr(decoder, 'done', False):
+            return
+
+    flush = getattr(decoder, 'flush', None)
+    if flush is not None:
+        flush()
+        for item in out:
+            yield item
+
+
+def chunked_json_decoder(callback, max_size=DEFAULT_MAX_MESSAGE_SIZE):
+    """Decoder for chunked streams of JSON messages, such as ``events()`` or
+    the progress output of ``pull()`` and ``push()``."""
+    return ChunkedDecoder(JSONDecoder(callback, max_size).feed, max_size)
+
+
+def iter_chunked_json(chunks, max_size=DEFAULT_MAX_MESSAGE_SIZE):
+    """Generator of the JSON messages in a chunked stream."""
+    chunks = iter_decoded(ChunkedDecoder, chunks, max_size=max_size)
+    return iter_decoded(JSONDecoder, chunks, max_size=max_size)
+
+
+class FrameReader(object):
+    """Reads a multiplexed attach/logs stream from a socket.
+
+    Frames are read with ``recv_into`` into buffers that are reused for the
+    whole stream, so each frame costs a single copy however many reads it
+    arrives in. ``buffered`` holds any bytes already read off the socket.
+    Iterating yields ``(stream_id, data)`` tuples.
+    """
+
+    def __init__(self, socket, buffered=b''):
+        self.socket = socket
+        self._pending = memoryview(buffered)
+        self._header = bytearray(STREAM_HEADER_SIZE_BYTES)
+        self._payload = bytearray(READ_BUFFER_SIZE)
+
+    def __iter__(self):
+        self.socket.settimeout(None)
+        header_view = memoryview(self._header)
+        payload_view = memoryview(self._payload)
+
+        while True:
+            if not self._read_into(header_view):
+                return
+            stream_id, length = STREAM_HEADER.unpack_from(self._header)
+            if not length:
+                return
+            if length > len(self._payload):
+                self._payload = bytearray(length)
+                payload_view = memoryview(self._payload)
+            if not self._read_into(payload_view[:length]):
+                return
+            yield stream_id, payload_view[:length].tobytes()
+
+    def _read_into(self, view):
+        size = len(view)
+        got = 0
+        while got < size:
+            if len(self._pending):
+                n = min(size - got, len(self._pending))
+                view[got:got + n] = self._pending[:n]
+                self._pending = self._pending[n:]
+            else:
+                n = self.socket.recv_into(view[got:])
+                if not n:
+                    return False
+            got += n
+        return True
+
+
+def demux(frames, stdout=None, stderr=None):
+    """Writes each ``(stream_id, data)`` frame to the ``stdout`` or ``stderr``
+    file-like object, dropping frames for streams without one."""
+    for stream_id, data in frames:
+        sink = stderr if stream_id == STDERR else stdout
+        if sink is not None:
+            sink.write(data)
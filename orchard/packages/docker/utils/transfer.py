@@ -0,0 +1,155 @@
+# Copyright 2013 dotCloud inc.
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Streaming helpers for the tar archives returned by ``export()`` and
+``copy()``. Archives are read in fixed-size blocks and never held in memory
+as a whole."""
+
+import fnmatch
+import os
+import tarfile
+import time
+
+READ_SIZE = 256 * 1024
+
+
+class TransferStats(object):
+    def __init__(self):
+        self.bytes = 0
+        self.entries = 0
+        self.started = time.time()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / max(self.elapsed, 1e-6)
+
+    @property
+    def entries_per_second(self):
+        return self.entries / max(self.elapsed, 1e-6)
+
+    def __repr__(self):
+        return '<TransferStats: {0} bytes, {1} entries in {2:.2f}s>'.format(
+            self.bytes, self.entries, self.elapsed)
+
+
+class CountingReader(object):
+    """Wraps a file-like object, counting the bytes read through it into
+    ``stats`` and calling ``progress(stats)`` after each read."""
+
+    def __init__(self, fileobj, stats, progress=None):
+        self.fileobj = fileobj
+        self.stats = stats
+        self.progress = progress
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.stats.bytes += len(data)
+        if self.progress is not None:
+            self.progress(self.stats)
+        return data
+
+
+def member_matches(member, paths):
+    """Whether a tar member is selected by ``paths``, a list of glob
+    patterns. Members inside a matching directory are selected too."""
+    if paths is None:
+        return True
+    name = os.path.normpath(member.name).lstrip('/')
+    parts = name.split('/')
+    prefixes = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+    return any(fnmatch.fnmatch(prefix, pattern)
+               for prefix in prefixes for pattern in paths)
+
+
+def _is_safe(member, root):
+    # Resolving the real path catches members that would be written through
+    # a symlink extracted earlier, as well as plain '..' and absolute names.
+    path = os.path.join(root, member.name)
+    if member.issym() or member.islnk():
+        # Links replace whatever is at their own path, so only their parent
+        # directory is followed.
+        parent = os.path.realpath(os.path.dirname(path))
+        if not _within(root, parent):
+            return False
+        if member.issym():
+            target = os.path.join(parent, member.linkname)
+        else:
+            target = os.path.join(root, member.linkname)
+        return _within(root, os.path.realpath(target))
+    return _within(root, os.path.realpath(path))
+
+
+def _within(root, path):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def extract_stream(fileobj, dest, paths=None, progress=None):
+    """Extracts the tar archive read from ``fileobj`` into the directory
+    ``dest`` as it arrives, keeping only members selected by ``paths``.
+    Members that would land outside ``dest``, and links that point outside
+    it, are skipped. Returns a :class:`TransferStats`."""
+    stats = TransferStats()
+    reader = CountingReader(fileobj, stats, progress)
+    root = os.path.realpath(dest)
+    archive = tarfile.open(fileobj=reader, mode='r|')
+    try:
+        for member in archive:
+            if (not member_matches(member, paths) or
+                    not _is_safe(member, root)):
+                continue
+            archive.extract(member, dest)
+            stats.entries += 1
+    finally:
+        archive.close()
+    stats.finished = time.time()
+    return stats
+
+
+def copy_stream(fileobj, dest, paths=None, progress=None):
+    """Writes the tar archive read from ``fileobj`` to the file-like object
+    ``dest``. With ``paths``, the archive is rewritten on the fly to hold
+    only the selected members; otherwise it is copied through block by block
+    without being parsed, and no entries are counted. Returns a
+    :class:`TransferStats`."""
+    stats = TransferStats()
+    reader = CountingReader(fileobj, stats, progress)
+
+    if paths is None:
+        while True:
+            block = reader.read(READ_SIZE)
+            if not block:
+                break
+            dest.write(block)
+        stats.finished = time.time()
+        return stats
+
+    archive = tarfile.open(fileobj=reader, mode='r|')
+    out = tarfile.open(fileobj=dest, mode='w|', format=tarfile.GNU_FORMAT)
+    try:
+        for member in archive:
+            if not member_matches(member, paths):
+                continue
+            data = archive.extractfile(member) if member.isreg() else None
+            out.addfile(member, data)
+            stats.entries += 1
+    finally:
+        out.close()
+        archive.close()
+    stats.finished = time.time()
+    return stats
@@ -12,7 +12,10 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import fnmatch
 import io
+import os
+import stat
 import tarfile
 import tempfile
 
@@ -20,9 +23,10 @@ import requests
 import six
 
 
-def mkbuildcontext(dockerfile):
+def mkbuildcontext(dockerfile, deterministic=False):
     f = tempfile.NamedTemporaryFile()
-    t = tarfile.open(mode='w', fileobj=f)
+    # GNU format, as tar_stream uses, never writes PAX timestamp headers.
+    t = tarfile.open(mode='w', fileobj=f, format=tarfile.GNU_FORMAT)
     if isinstance(dockerfile, io.StringIO):
         dfinfo = tarfile.TarInfo('Dockerfile')
         if six.PY3:
@@ -35,21 +39,241 @@ def mkbuildcontext(dockerfile):
         dfinfo.size = len(dockerfile.getvalue())
     else:
         dfinfo = t.gettarinfo(fileobj=dockerfile, arcname='Dockerfile')
+    if deterministic:
+        normalize_tarinfo(dfinfo)
     t.addfile(dfinfo, dockerfile)
     t.close()
     f.seek(0)
     return f
 
 
-def tar(path):
+def tar(path, deterministic=False):
     f = tempfile.NamedTemporaryFile()
-    t = tarfile.open(mode='w', fileobj=f)
-    t.add(path, arcname='.')
-    t.close()
+    for chunk in tar_stream(path, deterministic=deterministic):
+        f.write(chunk)
     f.seek(0)
     return f
 
 
+TAR_CHUNK_SIZE = 64 * 1024
+
+
+def tar_stream(path, chunk_size=TAR_CHUNK_SIZE, excludes=None,
+               deterministic=False):
+    """Generator of a tar archive of ``path``, in chunks of about
+    ``chunk_size`` bytes, produced as the files are read. Memory use is
+    bounded by the chunk size however large the tree is. Regular files,
+    directories and symlinks are included; other file types are skipped, as
+    is anything matching one of the ``excludes`` patterns.
+
+    With ``deterministic``, the same tree always gives the same bytes: see
+    :func:`tar_entries`."""
+    entries = tar_entries(path, excludes, deterministic)
+    return tar_entries_stream(entries, chunk_size)
+
+
+def tar_entries_stream(entries, chunk_size=TAR_CHUNK_SIZE):
+    """Like :func:`tar_stream`, for entries from :func:`tar_entries`."""
+    return _coalesce(_tar_blocks(entries, chunk_size), chunk_size)
+
+
+def tar_entries(path, excludes=None, deterministic=False):
+    """Generator of ``(full_path, TarInfo)`` pairs for everything that would
+    go into a tar archive of ``path``. The tree is walked as the entries are
+    consumed.
+
+    With ``deterministic``, entries are sorted by name and their metadata is
+    normalized with :func:`normalize_tarinfo`, so identical trees on
+    different machines give identical archives.
+    """
+    for full_path, arcname in _walk(path, '.', excludes or [], deterministic):
+        info = _tarinfo(full_path, arcname)
+        if info is None:
+            continue
+        if deterministic:
+            normalize_tarinfo(info)
+        yield full_path, info
+
+
+def normalize_tarinfo(info):
+    """Strips the machine-specific metadata from a TarInfo: timestamps,
+    ownership and any permission bits beyond "executable or not"."""
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    if info.issym():
+        info.mode = 0o777
+    elif info.isdir() or info.mode & 0o111:
+        info.mode = 0o755
+    else:
+        info.mode = 0o644
+    return info
+
+
+def _tar_blocks(entries, chunk_size):
+    written = 0
+    for full_path, info in entries:
+        header = info.tobuf(tarfile.GNU_FORMAT)
+        written += len(header)
+        yield header
+
+        if info.isreg():
+            for block in _read_file(full_path, info.size, chunk_size):
+                yield block
+            written += info.size
+            padding = -info.size % tarfile.BLOCKSIZE
+            if padding:
+                written += padding
+                yield tarfile.NUL * padding
+
+    # End-of-archive marker, padded to a whole record like tarfile does.
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(written + end) % tarfile.RECORDSIZE
+    yield tarfile.NUL * end
+
+
+def _walk(path, arcname, excludes, ordered=False):
+    yield path, arcname
+    if os.path.isdir(path) and not os.path.islink(path):
+        names = os.listdir(path)
+        if ordered:
+            names.sort()
+        for name in names:
+            child_arcname = os.path.join(arcname, name)
+            if is_excluded(child_arcname[2:], excludes):
+                continue
+            for entry in _walk(os.path.join(path, name), child_arcname,
+                               excludes, ordered):
+                yield entry
+
+
+def read_dockerignore(path):
+    """Returns the exclusion patterns in ``path``'s .dockerignore, if it has
+    one."""
+    try:
+        with open(os.path.join(path, '.dockerignore')) as f:
+            lines = f.read().splitlines()
+    except IOError:
+        return []
+
+    patterns = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            patterns.append(os.path.normpath(line).lstrip('/'))
+    return patterns
+
+
+def is_excluded(relative_path, excludes):
+    # Excluding a directory excludes everything in it, and we never descend
+    # into excluded directories, so only the path itself needs checking.
+    parts = relative_path.split('/')
+    return any(_match_parts(parts, pattern.split('/'))
+               for pattern in excludes)
+
+
+def _match_parts(parts, pattern):
+    # Like Go's filepath.Match, which the daemon uses: wildcards match within
+    # a single path segment, never across a '/'.
+    return len(parts) == len(pattern) and all(
+        fnmatch.fnmatchcase(part, glob) for part, glob in zip(parts, pattern))
+
+
+def _tarinfo(path, arcname):
+    st = os.lstat(path)
+    info = tarfile.TarInfo(arcname)
+    info.mode = stat.S_IMODE(st.st_mode)
+    info.uid = st.st_uid
+    info.gid = st.st_gid
+    info.mtime = st.st_mtime
+
+    if stat.S_ISREG(st.st_mode):
+        info.type = tarfile.REGTYPE
+        info.size = st.st_size
+    elif stat.S_ISDIR(st.st_mode):
+        info.type = tarfile.DIRTYPE
+    elif stat.S_ISLNK(st.st_mode):
+        info.type = tarfile.SYMTYPE
+        info.linkname = os.readlink(path)
+    else:
+        return None
+
+    return info
+
+
+def _read_file(path, size, chunk_size):
+    # The header already promised ``size`` bytes, so stick to it even if the
+    # file changes while it's being read.
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining > 0:
+            block = f.read(min(chunk_size, remaining))
+            if not block:
+                raise IOError('{0} shrank while it was being archived'.format(
+                    path))
+            remaining -= len(block)
+            yield block
+
+
+def _coalesce(blocks, size):
+    pending = []
+    pending_size = 0
+    for block in blocks:
+        pending.append(block)
+        pending_size += len(block)
+        if pending_size >= size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield b''.join(pending)
+
+
+class ProgressReader(object):
+    """Wraps a file so that reading it reports progress. Request bodies are
+    read from it in small blocks, so the file is never held in memory.
+    ``callback(sent, total)`` is called after every read."""
+
+    def __init__(self, fileobj, size, callback=None):
+        self.fileobj = fileobj
+        self.size = size
+        self.callback = callback
+        self.sent = 0
+
+    def __len__(self):
+        return self.size
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sent += len(data)
+        if self.callback is not None:
+            self.callback(self.sent, self.size)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def iter_progress(chunks, callback=None, size=None):
+    """Generator that passes chunks through, calling ``callback(sent, size)``
+    after each one."""
+    sent = 0
+    for chunk in chunks:
+        sent += len(chunk)
+        yield chunk
+        if callback is not None:
+            callback(sent, size)
+
+
+def iter_file(fileobj, chunk_size=TAR_CHUNK_SIZE):
+    """Generator of the contents of a file in ``chunk_size`` blocks."""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
 def compare_version(v1, v2):
     return float(v2) - float(v1)
 
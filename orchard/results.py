@@ -0,0 +1,40 @@
+class Result(object):
+    """The outcome of an operation on one host or container: either
+    ``result`` or ``error`` is set. ``shared`` is true if the work was done
+    by a concurrent caller that asked for the same thing.
+
+    The host or container is ``subject``, also available as ``host`` or
+    ``container``, whichever reads better. This class is exported as
+    :class:`orchard.fleet.HostResult` and
+    :class:`orchard.bulk.ContainerResult`."""
+
+    def __init__(self, subject, result=None, error=None, started=None,
+                 finished=None, shared=False):
+        self.subject = subject
+        self.result = result
+        self.error = error
+        self.started = started
+        self.finished = finished
+        self.shared = shared
+
+    @property
+    def host(self):
+        return self.subject
+
+    @property
+    def container(self):
+        return self.subject
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def elapsed(self):
+        return self.finished - self.started
+
+    def __repr__(self):
+        outcome = 'ok' if self.ok else repr(self.error)
+        # Hosts have names; containers are IDs, which are shortened.
+        name = getattr(self.subject, 'name', None) or self.subject[:12]
+        return "<Result: %s %s in %.2fs>" % (name, outcome, self.elapsed)
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import json
+import urllib
+
+import requests
+
+from . import bulk
+
+
+class ContainerTemplate(object):
+    """Creates many containers from the same configuration.
+
+    Takes the same options as ``create_container()``, which are checked and
+    serialised once, up front. Each container can then be given its own
+    name and environment variables, which are merged over the template's;
+    only those are serialised per container.
+
+        >>> template = docker.container_template('worker', command='run')
+        >>> template.create(name='worker-1', environment={'SHARD': '1'})
+        >>> template.create_many(('worker-%d' % i, {'SHARD': str(i)})
+        ...                      for i in range(1000))
+    """
+
+    def __init__(self, client, image, **kwargs):
+        if not image:
+            raise ValueError('A container template needs an image')
+
+        self.client = client
+        config = client._container_config(image, kwargs.pop('command', None),
+                                          **kwargs)
+        self.environment = _parse_environment(config.pop('Env'))
+
+        # Go <1.1 can't unserialize null to a string, so leave out anything
+        # that isn't set, as _post_json() does.
+        static = dict((k, v) for k, v in config.items() if v is not None)
+        self._static_body = json.dumps(static)
+        self._body_prefix = self._static_body[:-1] + ', "Env": '
+        self._default_body = self._body(self.environment)
+
+        self._url = client._url('/containers/create')
+        self._request = client.prepare_request(requests.Request(
+            'POST', self._url, data=self._default_body,
+            headers={'Content-Type': 'application/json'}))
+
+    def body(self, environment=None):
+        """Returns the JSON request body for a container, with
+        ``environment`` merged over the template's."""
+        if not environment:
+            return self._default_body
+
+        merged = self.environment.copy()
+        merged.update(environment)
+        return self._body(merged)
+
+    def create(self, name=None, environment=None):
+        request = self._request.copy()
+        if name is not None:
+            request.url = '%s?%s' % (self._url,
+                                     urllib.urlencode({'name': name}))
+        request.body = self.body(environment)
+        request.headers['Content-Length'] = str(len(request.body))
+
+        response = self.client.send(request, timeout=self.client._timeout)
+        return self.client._result(response, True)
+
+    def create_many(self, instances, concurrency=bulk.DEFAULT_CONCURRENCY,
+                    stop_on_error=False):
+        """Creates a container for each of ``instances``, which are names or
+        ``(name, environment)`` pairs, at most ``concurrency`` at a time.
+        Like :func:`orchard.bulk.run_many`, returns a dict mapping names to
+        :class:`orchard.bulk.ContainerResult`, whose ``result`` is the
+        ``create_container()`` response."""
+        environments = {}
+        for instance in instances:
+            if isinstance(instance, tuple):
+                name, environment = instance
+            else:
+                name, environment = instance, None
+            if name in environments:
+                raise ValueError('Container name %r used twice' % name)
+            environments[name] = environment
+
+        return bulk.run_many(
+            lambda name: self.create(name, environments[name]),
+            environments, concurrency, stop_on_error)
+
+    def _body(self, environment):
+        if not environment:
+            return self._static_body
+        return self._body_prefix + json.dumps(
+            ['%s=%s' % item for item in environment.items()]) + '}'
+
+
+def _parse_environment(environment):
+    parsed = OrderedDict()
+    for variable in environment or []:
+        key, _, value = variable.partition('=')
+        parsed[key] = value
+    return parsed
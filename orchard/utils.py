@@ -1,4 +1,6 @@
 from pipes import quote
+import os
+import tempfile
 
 
 def request_to_curl_command(req):
@@ -17,3 +19,26 @@ def request_to_curl_command(req):
     cmd.append(quote(req.url))
 
     return " ".join(cmd)
+
+
+def write_if_changed(path, contents):
+    """Writes contents to path, readable only by the owner, unless the file
+    already holds exactly that. The file is replaced atomically, so
+    concurrent readers and writers never see it half-written."""
+    try:
+        with open(path) as fh:
+            if fh.read() == contents:
+                return False
+    except IOError:
+        pass
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(contents)
+        os.rename(tmp_path, path)
+    except:
+        os.unlink(tmp_path)
+        raise
+
+    return True
@@ -0,0 +1,173 @@
+import Queue
+import threading
+import time
+
+from .bulk import ContainerResult
+from .errors import ContainerTimeout
+from .events import EventDispatcher
+
+
+def wait_each(client, containers, timeout=None):
+    """Waits for containers to exit, yielding a
+    :class:`orchard.bulk.ContainerResult` for each as soon as it does, with
+    its exit code as the ``result``.
+
+    Rather than holding a ``wait()`` request open per container, this
+    watches a single event stream for ``die`` events and inspects only the
+    containers that have exited. ``timeout`` is in seconds, either for
+    every container or as a dict keyed by container; a container that is
+    still running when its time is up gets a :class:`ContainerTimeout`
+    error instead.
+    """
+    waiter = _Waiter(client, containers, timeout)
+    try:
+        for result in waiter:
+            yield result
+    finally:
+        waiter.close()
+
+
+def wait_any(client, containers, timeout=None):
+    """Returns the result for whichever container exits or times out
+    first."""
+    for result in wait_each(client, containers, timeout):
+        return result
+
+
+def wait_all(client, containers, timeout=None):
+    """Waits for every container, returning a dict mapping containers to
+    results."""
+    return dict((result.container, result)
+                for result in wait_each(client, containers, timeout))
+
+
+class _Waiter(object):
+    def __init__(self, client, containers, timeout):
+        self.client = client
+        self.containers = []
+        for container in containers:
+            if isinstance(container, dict):
+                container = container.get('Id')
+            self.containers.append(container)
+
+        self.started = time.time()
+        self.deadlines = {}
+        for container in self.containers:
+            if isinstance(timeout, dict):
+                seconds = timeout.get(container)
+            else:
+                seconds = timeout
+            if seconds is not None:
+                self.deadlines[container] = self.started + seconds
+
+        # Full IDs of the containers still running, mapped to the names
+        # they were given as.
+        self.pending = {}
+        self.queue = Queue.Queue()
+        self.closed = False
+
+        self.dispatcher = EventDispatcher(client)
+        self.dispatcher.subscribe(
+            lambda event: self.queue.put(event.get('id')), status='die')
+
+    def __iter__(self):
+        if not self.containers:
+            return
+
+        thread = threading.Thread(target=self._run, name='orchard-wait')
+        thread.daemon = True
+        thread.start()
+
+        remaining = set(self.containers)
+        while remaining:
+            deadline = min([self.deadlines[c] for c in remaining
+                            if c in self.deadlines] or [None])
+            try:
+                if deadline is None:
+                    # A timeout keeps the wait interruptible.
+                    item = self.queue.get(True, 3600)
+                else:
+                    item = self.queue.get(True, max(0, deadline - time.time()))
+            except Queue.Empty:
+                now = time.time()
+                for container in list(remaining):
+                    deadline = self.deadlines.get(container)
+                    if deadline is not None and deadline <= now:
+                        remaining.discard(container)
+                        yield ContainerResult(
+                            container, started=self.started, finished=now,
+                            error=ContainerTimeout(
+                                '%s is still running' % container))
+                continue
+
+            if isinstance(item, ContainerResult):
+                # Couldn't be looked up when the stream opened.
+                remaining.discard(item.container)
+                yield item
+            elif isinstance(item, Exception):
+                raise item
+            elif item in self.pending:
+                container = self.pending.pop(item)
+                if container in remaining:
+                    remaining.discard(container)
+                    yield self._exited(item, container)
+
+    def close(self):
+        self.closed = True
+        self.dispatcher.stop()
+
+    def _run(self):
+        try:
+            self.dispatcher.run(on_connect=self._check_running)
+        except Exception as e:
+            if not self.closed:
+                self.queue.put(e)
+        else:
+            if not self.closed:
+                self.queue.put(Exception(
+                    'Event stream ended before all containers exited'))
+
+    def _check_running(self):
+        """Resolves the containers to full IDs once the event stream is open,
+        and queues those that have already exited."""
+        if self.closed:
+            self.dispatcher.stop()
+            return
+
+        listed = {}
+        for container in self.client.containers(all=True, trunc=False):
+            for name in [container['Id']] + container.get('Names', []):
+                listed[name.lstrip('/')] = container
+
+        for container in self.containers:
+            info = listed.get(container.lstrip('/'))
+            if info is None:
+                info = self._find(container)
+            if info is None:
+                continue
+
+            self.pending[info['Id']] = container
+            if not info.get('Status', '').startswith('Up'):
+                self.queue.put(info['Id'])
+
+    def _find(self, container):
+        # Short IDs, and containers that aren't in the listing.
+        started = time.time()
+        try:
+            info = self.client.inspect_container(container)
+        except Exception as e:
+            self.queue.put(ContainerResult(container, error=e, started=started,
+                                           finished=time.time()))
+            return None
+        running = info.get('State', {}).get('Running')
+        return {'Id': info.get('Id') or info.get('ID'),
+                'Status': 'Up' if running else ''}
+
+    def _exited(self, container_id, container):
+        try:
+            info = self.client.inspect_container(container_id)
+            return ContainerResult(container, result=info['State']['ExitCode'],
+                                   started=self.started, finished=time.time())
+        except Exception as e:
+            return ContainerResult(container, error=e, started=self.started,
+                                   finished=time.time())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Wall-clock time to upload a build context with ``build()``, uncompressed
+and with each compression method, for a text-heavy and a binary-heavy tree,
+to a fake daemon that reads no faster than a WAN link. Then the parallel
+speedup of compression on its own, with one, two and four workers per CPU.
+
+    python script/bench/compression.py [megabytes] [link MB/s] [level]
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from fake_daemon import FakeDaemon
+
+from orchard.packages import docker
+from orchard.packages.docker.utils import compression
+
+MB = 1024 * 1024
+FILE_SIZE = MB
+
+WORDS = [
+    'FROM', 'RUN', 'apt-get', 'install', 'def', 'return', 'import', 'self',
+    'class', 'print', 'for', 'in', 'if', 'else', 'None', 'True', 'value',
+    'name', 'path', 'config', 'request', 'response', 'error', '=', '(', ')',
+]
+
+
+def text_context(size):
+    rng = random.Random(0)
+    lines = []
+    length = 0
+    while length < size:
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        lines.append(line)
+        length += len(line) + 1
+    data = '\n'.join(lines)[:size]
+    return [data[i:i + 65536] for i in range(0, len(data), 65536)]
+
+
+def binary_context(size):
+    return [os.urandom(65536) for _ in range(size // 65536)]
+
+
+def make_tree(chunks):
+    """Writes ``chunks`` out as a build context of 1 MB files."""
+    tree = tempfile.mkdtemp(prefix='orchard-context-')
+    with open(os.path.join(tree, 'Dockerfile'), 'w') as f:
+        f.write('FROM busybox\nADD . /app\n')
+    per_file = FILE_SIZE // 65536
+    for i in range(0, len(chunks), per_file):
+        with open(os.path.join(tree, 'file%04d' % i), 'wb') as f:
+            f.write(''.join(chunks[i:i + per_file]))
+    return tree
+
+
+def methods():
+    available = [None, compression.GZIP]
+    if compression.lzma is not None:
+        available.append(compression.XZ)
+    return available
+
+
+def upload_times(trees, bandwidth, level):
+    daemon = FakeDaemon(bandwidth=bandwidth)
+    client = docker.Client(daemon.url)
+    try:
+        for name, tree in trees:
+            timings = []
+            for method in methods():
+                daemon.reset()
+                started = time.time()
+                list(client.build(path=tree, stream=True, compression=method,
+                                  compression_level=level))
+                timings.append('%s %.1f MB %.2fs' % (
+                    method or 'none', daemon.received / float(MB),
+                    time.time() - started))
+            print '%-6s  %s' % (name, '   '.join(timings))
+    finally:
+        client.close()
+        daemon.close()
+
+
+def speedups(contexts, level):
+    cpus = multiprocessing.cpu_count()
+    for name, chunks in contexts:
+        for method in methods()[1:]:
+            baseline = None
+            for workers in sorted(set([1, cpus, 2 * cpus, 4 * cpus])):
+                started = time.time()
+                for _ in compression.compress_stream(chunks, method, level,
+                                                     workers=workers):
+                    pass
+                elapsed = time.time() - started
+                if baseline is None:
+                    baseline = elapsed
+                print '%-6s  %-4s %2d workers: %.1f MB/s, %.2fx speedup' % (
+                    name, method, workers,
+                    len(chunks) * 65536.0 / MB / elapsed, baseline / elapsed)
+
+
+def main(megabytes=16, link=2, level=compression.DEFAULT_LEVEL):
+    contexts = [('text', text_context(megabytes * MB)),
+                ('binary', binary_context(megabytes * MB))]
+    trees = [(name, make_tree(chunks)) for name, chunks in contexts]
+    try:
+        print 'Build upload over a %d MB/s link, level %d:' % (link, level)
+        upload_times(trees, link * MB, level)
+        print
+        print 'Compression alone, %d CPUs:' % multiprocessing.cpu_count()
+        speedups(contexts, level)
+    finally:
+        for _, tree in trees:
+            shutil.rmtree(tree)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,213 @@
+"""A minimal stand-in for the Docker daemon, used by the benchmarks here.
+
+Listens on a Unix socket or on a local TCP port, optionally with TLS, and
+counts the connections it accepts. It answers just enough of the API for
+the benchmarks: listing, inspecting and creating containers, and taking
+build contexts. Responses can be delayed to stand in for a remote or busy
+daemon, and uploads slowed to stand in for a WAN link.
+"""
+import BaseHTTPServer
+import SocketServer
+import json
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Lets the benchmarks import orchard from the checkout they live in.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # One write per response, so Nagle doesn't skew the numbers.
+    wbufsize = -1
+
+    def setup(self):
+        if self.request.family != socket.AF_UNIX:
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def address_string(self):
+        return 'fake-daemon'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        path = self.path.split('?')[0]
+        if path.endswith('/containers/json'):
+            return self.send_json(200, [{'Id': 'c%d' % i} for i in range(3)])
+        if path.startswith('/v') and path.endswith('/json'):
+            return self.send_json(200, {'Id': path.split('/')[-2]})
+        self.send_json(404, {})
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        received = self.read_body()
+        time.sleep(self.server.latency)
+        if path.endswith('/containers/create'):
+            with self.server.lock:
+                self.server.created += 1
+                container_id = '%064x' % self.server.created
+            return self.send_json(201, {'Id': container_id})
+        if path.endswith('/build'):
+            with self.server.lock:
+                self.server.received += received
+            return self.send_stream([
+                {'stream': 'Step 0 : FROM busybox\n'},
+                {'stream': 'Successfully built 0123456789ab\n'},
+            ])
+        self.send_json(404, {})
+
+    def read_body(self):
+        """Reads and discards the request body, no faster than the server's
+        ``bandwidth``, and returns its size."""
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            length = int(self.headers.get('Content-Length') or 0)
+            self.drain(length)
+            return length
+
+        size = 0
+        while True:
+            length = int(self.rfile.readline().split(';')[0], 16)
+            if not length:
+                # Skip any trailer, up to the empty line that ends it.
+                while self.rfile.readline().strip():
+                    pass
+                return size
+            self.drain(length)
+            self.rfile.readline()
+            size += length
+
+    def drain(self, length):
+        bandwidth = self.server.bandwidth
+        while length:
+            block = self.rfile.read(min(length, 64 * 1024))
+            if not block:
+                raise EOFError('Request body ended early')
+            length -= len(block)
+            if bandwidth:
+                time.sleep(len(block) / float(bandwidth))
+
+    def send_json(self, status, body):
+        body = json.dumps(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.headers.get('Connection', '').lower() == 'close':
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, messages):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for message in messages:
+            data = json.dumps(message)
+            self.wfile.write('%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.write('0\r\n\r\n')
+
+
+class _Counting(SocketServer.ThreadingMixIn):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on idle connections, often without a TLS goodbye.
+        pass
+
+    def count(self, request):
+        with self.lock:
+            self.accepted += 1
+        return request
+
+
+class UnixServer(_Counting, SocketServer.UnixStreamServer):
+    def get_request(self):
+        request, _ = self.socket.accept()
+        return self.count((request, ('fake-daemon', 0)))
+
+
+class TCPServer(_Counting, BaseHTTPServer.HTTPServer):
+    def get_request(self):
+        return self.count(BaseHTTPServer.HTTPServer.get_request(self))
+
+
+class FakeDaemon(object):
+    """Runs a fake daemon on a background thread. ``url`` is the base URL
+    to give a client; ``accepted`` is the number of connections so far.
+    With ``tls`` set, a throwaway self-signed certificate is generated with
+    ``openssl`` and its path is available as ``ca_cert``. Every response is
+    delayed by ``latency`` seconds, and request bodies are read at no more
+    than ``bandwidth`` bytes a second; ``received`` is the number of build
+    context bytes taken so far."""
+
+    def __init__(self, unix=True, tls=False, latency=0, bandwidth=None):
+        self.directory = tempfile.mkdtemp(prefix='orchard-bench-')
+        if unix:
+            path = os.path.join(self.directory, 'docker.sock')
+            self.server = UnixServer(path, Handler)
+            self.url = 'unix://' + path
+        else:
+            self.server = TCPServer(('127.0.0.1', 0), Handler)
+            scheme = 'https' if tls else 'http'
+            self.url = '%s://localhost:%d' % (scheme,
+                                              self.server.server_address[1])
+        if tls:
+            self.ca_cert = self._make_certificate()
+            self.server.socket = ssl.wrap_socket(
+                self.server.socket, server_side=True,
+                certfile=self.ca_cert, keyfile=self._key)
+
+        self.server.lock = threading.Lock()
+        self.server.accepted = 0
+        self.server.created = 0
+        self.server.latency = latency
+        self.server.bandwidth = bandwidth
+        self.server.received = 0
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def accepted(self):
+        return self.server.accepted
+
+    @property
+    def received(self):
+        return self.server.received
+
+    def reset(self):
+        with self.server.lock:
+            self.server.accepted = 0
+            self.server.received = 0
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _make_certificate(self):
+        cert = os.path.join(self.directory, 'cert.pem')
+        self._key = os.path.join(self.directory, 'key.pem')
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call([
+                'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                '-days', '1', '-subj', '/CN=localhost',
+                '-keyout', self._key, '-out', cert,
+            ], stdout=devnull, stderr=devnull)
+        return cert
+
+
+def rate(count, seconds):
+    return '%d calls in %.2fs, %.0f/s' % (count, seconds, count / seconds)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Containers created per second with a ``create_container()`` loop, a
+``ContainerTemplate.create()`` loop and ``ContainerTemplate.create_many()``,
+against a fake daemon with no latency and with 5 ms per request, plus the
+client-side cost of building one request body.
+
+    python script/bench/templates.py [containers]
+"""
+import json
+import sys
+import time
+
+from fake_daemon import FakeDaemon
+
+from orchard.docker_client import DockerClient
+
+OPTIONS = dict(command='python worker.py', ports=[8000, (53, 'udp')],
+               volumes=['/data'], environment={'MODE': 'fast'},
+               mem_limit=1 << 28, detach=True, working_dir='/app')
+
+
+def environment(i):
+    return {'SHARD': str(i)}
+
+
+def body_cost(client, template, count=20000):
+    started = time.time()
+    for i in range(count):
+        options = dict(OPTIONS, environment=dict(OPTIONS['environment'],
+                                                 **environment(i)))
+        config = client._container_config('worker',
+                                          options.pop('command'), **options)
+        json.dumps(dict((k, v) for k, v in config.items() if v is not None))
+    before = (time.time() - started) / count
+
+    started = time.time()
+    for i in range(count):
+        template.body(environment(i))
+    after = (time.time() - started) / count
+    return before * 1e6, after * 1e6
+
+
+def main(count=1000):
+    for latency in (0, 0.005):
+        daemon = FakeDaemon(latency=latency)
+        client = DockerClient(daemon.url, None, None)
+        template = client.container_template('worker', **OPTIONS)
+
+        def create_container_loop():
+            for i in range(count):
+                options = dict(OPTIONS, environment=dict(
+                    OPTIONS['environment'], **environment(i)))
+                client.create_container('worker', name='w%d' % i, **options)
+
+        def template_loop():
+            for i in range(count):
+                template.create('w%d' % i, environment(i))
+
+        def template_many():
+            results = template.create_many(
+                ('w%d' % i, environment(i)) for i in range(count))
+            assert all(result.ok for result in results.values())
+
+        print '%d ms latency' % (latency * 1000)
+        for name, run in (('create_container() loop', create_container_loop),
+                          ('template.create() loop', template_loop),
+                          ('template.create_many()', template_many)):
+            started = time.time()
+            run()
+            print '  %-24s %.0f/s' % (name, count / (time.time() - started))
+
+        if not latency:
+            print '  request body: %.0f us -> %.0f us' % body_cost(client,
+                                                                   template)
+        client.close()
+        daemon.close()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Time per ``inspect_container()`` call over TLS when a new client is made
+for every call, as Host.docker() callers often do, with a plain
+docker.Client (a TLS handshake each time) and with DockerClient (which
+shares established connections between clients for the same host).
+
+    python script/bench/tls_reuse.py [calls]
+
+Needs the ``openssl`` command to make a throwaway certificate.
+"""
+import os
+import sys
+import time
+import warnings
+
+from fake_daemon import FakeDaemon
+
+from orchard.docker_client import DockerClient
+from orchard.packages import docker
+
+# requests would verify against these instead of the throwaway certificate.
+for name in ('REQUESTS_CA_BUNDLE', 'CURL_CA_BUNDLE'):
+    os.environ.pop(name, None)
+
+
+class PlainClient(docker.Client):
+    def __init__(self, base_url, verify, cert):
+        docker.Client.__init__(self, base_url)
+        self.verify = verify
+        self.cert = cert
+
+
+def main(calls=200):
+    # The certificate has no subjectAltName, which urllib3 warns about.
+    warnings.simplefilter('ignore')
+    daemon = FakeDaemon(unix=False, tls=True)
+    try:
+        for label, cls in (('docker.Client', PlainClient),
+                           ('DockerClient', DockerClient)):
+            daemon.reset()
+            started = time.time()
+            for _ in range(calls):
+                client = cls(daemon.url, daemon.ca_cert, None)
+                client.inspect_container('c1')
+                client.close()
+            elapsed = time.time() - started
+            print '%-14s %.2f ms/call, %d connections' % (
+                label, elapsed / calls * 1000, daemon.accepted)
+    finally:
+        daemon.close()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
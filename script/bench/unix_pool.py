@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Requests per second and connections opened for ``containers()`` and
+``inspect_container()`` over a Unix socket, with a new connection pool per
+request (as UnixAdapter used to build) and with the cached pool.
+
+    python script/bench/unix_pool.py [calls]
+"""
+import sys
+import time
+
+from fake_daemon import FakeDaemon, rate
+
+from orchard.packages import docker
+from orchard.packages.docker.unixconn import unixconn
+
+
+class PoolPerRequestAdapter(unixconn.UnixAdapter):
+    def get_connection(self, url, proxies=None):
+        return unixconn.UnixHTTPConnectionPool(self.base_url,
+                                               self.socket_path, self.timeout)
+
+
+def main(calls=500):
+    daemon = FakeDaemon()
+    try:
+        for label, adapter in (('pool per request', PoolPerRequestAdapter),
+                               ('cached pool', None)):
+            client = docker.Client(daemon.url)
+            if adapter is not None:
+                client.mount('http+unix://', adapter(client.base_url))
+
+            for name, call in (('containers()', client.containers),
+                               ('inspect_container()',
+                                lambda: client.inspect_container('c1'))):
+                daemon.reset()
+                started = time.time()
+                for _ in range(calls):
+                    call()
+                print '%-16s %-20s %s, %d connections' % (
+                    label, name, rate(calls, time.time() - started),
+                    daemon.accepted)
+            client.close()
+    finally:
+        daemon.close()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
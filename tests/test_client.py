@@ -0,0 +1,79 @@
+import BaseHTTPServer
+import SocketServer
+import threading
+import unittest
+
+from orchard.client import Client
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # One write per response, so Nagle doesn't slow the tests down.
+    wbufsize = -1
+
+    def do_GET(self):
+        body = '{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.headers.get('Connection', '').lower() == 'close':
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.accepted = 0
+
+    def get_request(self):
+        request = BaseHTTPServer.HTTPServer.get_request(self)
+        self.accepted += 1
+        return request
+
+
+class ConnectionReuseTest(unittest.TestCase):
+    def setUp(self):
+        self.server = CountingServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_serial_requests_share_one_connection(self):
+        client = Client(self.url)
+        for _ in range(20):
+            self.assertEqual(client.request('GET', '/ping', quiet=True),
+                             {'ok': True})
+        self.assertEqual(self.server.accepted, 1)
+
+    def test_threads_share_the_pool(self):
+        client = Client(self.url, pool_maxsize=4, pool_block=True)
+
+        def work():
+            for _ in range(25):
+                client.request('GET', '/ping', quiet=True)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(1 <= self.server.accepted <= 4, self.server.accepted)
+
+    def test_keep_alive_false_closes_connections(self):
+        client = Client(self.url, keep_alive=False)
+        for _ in range(5):
+            client.request('GET', '/ping', quiet=True)
+        self.assertEqual(self.server.accepted, 5)
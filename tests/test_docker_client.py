@@ -0,0 +1,97 @@
+import BaseHTTPServer
+import SocketServer
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import unittest
+
+from orchard.docker_client import DockerClient
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def do_GET(self):
+        body = '[]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.accepted = 0
+
+    def get_request(self):
+        request = BaseHTTPServer.HTTPServer.get_request(self)
+        self.accepted += 1
+        return request
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on idle connections without a TLS goodbye.
+        pass
+
+
+class CloseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='orchard-test-')
+        self.ca_cert = os.path.join(self.directory, 'cert.pem')
+        key = os.path.join(self.directory, 'key.pem')
+        with open(os.devnull, 'w') as devnull:
+            try:
+                subprocess.check_call([
+                    'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                    '-days', '1', '-subj', '/CN=localhost',
+                    '-keyout', key, '-out', self.ca_cert,
+                ], stdout=devnull, stderr=devnull)
+            except OSError:
+                shutil.rmtree(self.directory)
+                raise unittest.SkipTest('openssl is not installed')
+
+        self.server = CountingServer()
+        self.server.socket = ssl.wrap_socket(
+            self.server.socket, server_side=True,
+            certfile=self.ca_cert, keyfile=key)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'https://localhost:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def client(self):
+        client = DockerClient(self.url, self.ca_cert, None)
+        # Keep REQUESTS_CA_BUNDLE and friends from overriding ``verify``.
+        client.trust_env = False
+        return client
+
+    def test_usable_after_close(self):
+        client = self.client()
+        self.assertEqual(client.containers(), [])
+        client.close()
+        self.assertEqual(client.containers(), [])
+
+    def test_close_leaves_shared_connections_open(self):
+        first = self.client()
+        first.containers()
+        first.close()
+
+        second = self.client()
+        self.assertEqual(second.containers(), [])
+        second.close()
+        self.assertEqual(self.server.accepted, 1)
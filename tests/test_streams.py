@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from orchard.packages.docker.utils.streams import (
+    ChunkedDecoder, JSONDecoder, StreamDecodeError, chunked_json_decoder)
+
+EVENTS = [
+    {'status': 'create', 'id': 'c1'},
+    {'status': 'start', 'id': 'c1', 'from': u'caf\xe9'},
+    {'status': 'die', 'id': 'c2'},
+]
+
+
+def chunk(data):
+    return b'%x\r\n%s\r\n' % (len(data), data)
+
+
+def encode(event):
+    return json.dumps(event, ensure_ascii=False).encode('utf-8')
+
+
+# Two events in one chunk, then one split across two chunks in the middle
+# of its two-byte 'é', then a trailer and the start of the next response.
+first, second, third = [encode(event) for event in EVENTS]
+split = second.index(b'\xc3') + 1
+BODY = (chunk(first + b'\n' + second[:split]) + chunk(second[split:]) +
+        chunk(b'\n' + third) + b'0\r\nX-Trailer: yes\r\n\r\n')
+LEFTOVER = b'HTTP/1.1 200 OK\r\n'
+
+
+class ChunkedJSONTest(unittest.TestCase):
+    def decode(self, pieces):
+        events = []
+        decoder = chunked_json_decoder(events.append)
+        for piece in pieces:
+            decoder.feed(piece)
+        return decoder, events
+
+    def test_split_at_every_offset(self):
+        stream = BODY + LEFTOVER
+        for i in range(len(stream) + 1):
+            decoder, events = self.decode([stream[:i], stream[i:]])
+            self.assertEqual(events, EVENTS, i)
+            self.assertTrue(decoder.done, i)
+            self.assertEqual(decoder.leftover, LEFTOVER, i)
+
+    def test_one_byte_at_a_time(self):
+        stream = BODY + LEFTOVER
+        decoder, events = self.decode(stream[i:i + 1]
+                                      for i in range(len(stream)))
+        self.assertEqual(events, EVENTS)
+        self.assertTrue(decoder.done)
+        self.assertEqual(decoder.leftover, LEFTOVER)
+
+    def test_not_done_before_the_trailer_ends(self):
+        decoder, events = self.decode([BODY[:-2]])
+        self.assertEqual(events, EVENTS)
+        self.assertFalse(decoder.done)
+        self.assertEqual(decoder.leftover, b'')
+
+    def test_max_size(self):
+        decoder = ChunkedDecoder(lambda data: None, max_size=4)
+        self.assertRaises(StreamDecodeError, decoder.feed, chunk(b'12345'))
+
+        decoder = JSONDecoder(lambda obj: None, max_size=4)
+        self.assertRaises(StreamDecodeError, decoder.feed, b'{"id": ')
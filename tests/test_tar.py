@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from orchard.packages.docker.utils import tar_stream
+
+
+class DeterministicTarTest(unittest.TestCase):
+    def setUp(self):
+        self.trees = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+
+        # Same contents, created in a different order, with different
+        # timestamps and permission bits.
+        for i, tree in enumerate(self.trees):
+            names = ['Dockerfile', 'app/run.sh', 'app/main.py']
+            if i:
+                names.reverse()
+            os.mkdir(os.path.join(tree, 'app'), 0o700 if i else 0o755)
+            for name in names:
+                path = os.path.join(tree, name)
+                with open(path, 'w') as f:
+                    f.write('contents of %s\n' % name)
+                mode = 0o755 if name.endswith('.sh') else 0o644
+                os.chmod(path, mode & (0o700 if i else 0o777))
+                os.utime(path, (1000000 * (i + 1),) * 2)
+            os.symlink('app/main.py', os.path.join(tree, 'main.py'))
+
+    def tearDown(self):
+        for tree in self.trees:
+            shutil.rmtree(tree)
+
+    def tar(self, tree, deterministic):
+        return b''.join(tar_stream(tree, deterministic=deterministic))
+
+    def test_deterministic_archives_are_identical(self):
+        first, second = [self.tar(tree, True) for tree in self.trees]
+        self.assertEqual(first, second)
+
+    def test_archives_differ_without_deterministic(self):
+        first, second = [self.tar(tree, False) for tree in self.trees]
+        self.assertNotEqual(first, second)